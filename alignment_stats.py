@@ -0,0 +1,75 @@
+"""
+Per-theme and per-heading alignment statistics.
+
+Every statistic is a vectorized reduction over the institutional x framework score matrix:
+column reductions first (sums, maxima, threshold counts), then a bincount over the group each
+framework column belongs to. Nothing is materialized per pair, and the stored form is a fixed-size
+histogram per group rather than the raw scores.
+"""
+from typing import Any, Dict, Hashable, List
+
+import numpy as np
+
+# Histogram bins over the cosine range; lexical scores only populate the upper half
+HISTOGRAM_EDGES = np.linspace(-1.0, 1.0, 41)
+
+
+class GroupStatistics:
+    """Aggregates score-matrix columns by a group label (e.g. the theme of each framework statement)"""
+
+    def __init__(self, labels: List[Hashable]):
+        # Groups keep the order in which they first appear among the columns
+        self.names = list(dict.fromkeys(labels))
+        positions = {name: g for g, name in enumerate(self.names)}
+        self.group_ids = np.array([positions[label] for label in labels], dtype=np.intp)
+        self.sizes = np.bincount(self.group_ids, minlength=len(self.names))
+
+    def _per_group(self, column_values: np.ndarray) -> np.ndarray:
+        """Sum per-column values within each group"""
+        return np.bincount(self.group_ids, weights=column_values, minlength=len(self.names))
+
+    def compute(self, similarity_matrix: np.ndarray, full_threshold: float,
+                partial_threshold: float) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Statistics per group:
+          - mean / max: over every institutional x statement pair in the group
+          - full_matches / partial_matches: pairs classified Full / Partial by the thresholds
+          - coverage: % of the group's statements matched at least partially by some institutional PLO
+          - histogram: pair counts per HISTOGRAM_EDGES bin
+        """
+        scores = np.asarray(similarity_matrix)
+        n_rows = scores.shape[0]
+        n_groups = len(self.names)
+        n_bins = len(HISTOGRAM_EDGES) - 1
+
+        pairs = self.sizes * n_rows
+        sums = self._per_group(scores.sum(axis=0, dtype=np.float64))
+        full = self._per_group((scores >= full_threshold).sum(axis=0))
+        partial = self._per_group(((scores >= partial_threshold) & (scores < full_threshold)).sum(axis=0))
+
+        group_max = np.full(n_groups, -np.inf)
+        covered = np.zeros(n_groups)
+        if n_rows:
+            column_max = scores.max(axis=0)
+            np.maximum.at(group_max, self.group_ids, column_max)
+            covered = self._per_group(column_max >= partial_threshold)
+
+        # One bincount over (group, bin) pairs builds every group's histogram at once
+        bins = np.clip(np.searchsorted(HISTOGRAM_EDGES, scores, side='right') - 1, 0, n_bins - 1)
+        histograms = np.bincount(
+            (self.group_ids[None, :] * n_bins + bins).ravel(), minlength=n_groups * n_bins
+        ).reshape(n_groups, n_bins)
+
+        stats = {}
+        for g, name in enumerate(self.names):
+            stats[name] = {
+                'statements': int(self.sizes[g]),
+                'pairs': int(pairs[g]),
+                'mean': round(float(sums[g] / pairs[g]), 3) if pairs[g] else 0.0,
+                'max': round(float(group_max[g]), 3) if pairs[g] else 0.0,
+                'full_matches': int(full[g]),
+                'partial_matches': int(partial[g]),
+                'coverage': round(100.0 * covered[g] / self.sizes[g], 1) if self.sizes[g] else 0.0,
+                'histogram': histograms[g].tolist()
+            }
+        return stats
@@ -1,15 +1,20 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import os
-import pandas as pd
-from datetime import datetime
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
 import json
+import zlib
 
-# Import the CPF comparison logic
-from cpf_comparison import CPFComparator
+# The CPF comparison logic (numpy, the embedding model, ...) is imported lazily; see get_comparator()
+from job_queue import ComparisonQueue
+from metrics import REGISTRY, REQUEST_SECONDS, RESULT_CACHE_LOOKUPS, stage_timer
+from plo_ingest import iter_plo_batches, normalize_programs
 
 app = Flask(__name__)
 
@@ -19,6 +24,19 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:/
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB default
+app.config['COMPARISON_MODE'] = os.environ.get('COMPARISON_MODE', 'sync')  # 'sync' or 'async'
+app.config['COMPARISON_WORKERS'] = int(os.environ.get('COMPARISON_WORKERS', 2))
+app.config['COMPARISON_JOB_TIMEOUT'] = int(os.environ.get('COMPARISON_JOB_TIMEOUT', 3600))  # seconds before a running job counts as abandoned
+app.config['RESULT_STORAGE'] = os.environ.get('RESULT_STORAGE', 'compact')  # 'compact' or 'full'
+app.config['RESULT_TOP_K'] = int(os.environ.get('RESULT_TOP_K', 10))
+app.config['WARMUP_ON_START'] = os.environ.get('WARMUP_ON_START', '0') == '1'  # load the model in the background at startup
+app.config['LAZY_RESULTS_MIN_PLOS'] = int(os.environ.get('LAZY_RESULTS_MIN_PLOS', 50))  # larger submissions load the matrix in pages
+app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', '0') == '1'  # allow ?profile=1 (see profile_request)
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+app.config['PEER_INDEX'] = os.environ.get('PEER_INDEX', '1') == '1'  # index saved PLOs for peer search (see peer_index.py)
+app.config['DASHBOARD_PAGE_SIZE'] = int(os.environ.get('DASHBOARD_PAGE_SIZE', 25))  # submissions per dashboard page
+app.config['RESULT_CACHE'] = os.environ.get('RESULT_CACHE', '1') == '1'  # store /api/compare responses (see CachedResult)
+app.config['RESULT_CACHE_MAX_BYTES'] = int(float(os.environ.get('RESULT_CACHE_MAX_MB', 256)) * 1024 * 1024)
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -38,20 +56,442 @@ class Institution(UserMixin, db.Model):
     plo_submissions = db.relationship('PLOSubmission', backref='institution', lazy=True)
 
 class PLOSubmission(db.Model):
+    # Serves the dashboard listing (an institution's submissions, newest first)
+    __table_args__ = (db.Index('ix_plo_submission_institution_submitted', 'institution_id', 'submitted_at'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     institution_id = db.Column(db.Integer, db.ForeignKey('institution.id'), nullable=False)
     submission_name = db.Column(db.String(100), nullable=False)
-    plos_data = db.Column(db.Text, nullable=False)  # JSON string of PLOs
-    comparison_results = db.Column(db.Text)  # JSON string of results
+    # The large JSON blobs are only loaded when accessed, so listings never read them
+    plos_data = db.deferred(db.Column(db.Text, nullable=False))  # JSON string of PLOs
+    comparison_results = db.deferred(db.Column(db.Text))  # JSON string of results
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='pending')
+    status = db.Column(db.String(20), default='pending')  # pending -> running -> completed / failed
+    claimed_at = db.Column(db.DateTime)  # when a background worker started the comparison
+    # Summary of the stored results, kept alongside them by store_results()
+    plo_count = db.Column(db.Integer)
+    overall_score = db.Column(db.Float)
+    theme_scores = db.Column(db.Text)  # JSON object of theme averages
+    
+    def store_results(self, results):
+        """Save comparison results as completed, together with their summary columns"""
+        summary = results['summary']
+        self.comparison_results = json.dumps(results)
+        self.status = 'completed'
+        self.plo_count = summary['total_plos_analyzed']
+        self.overall_score = summary['overall_alignment_score']
+        self.theme_scores = json.dumps(summary['theme_averages'])
+    
+    @property
+    def theme_averages(self):
+        return json.loads(self.theme_scores) if self.theme_scores else {}
+
+class CachedResult(db.Model):
+    """A compressed /api/compare response, keyed by CPFComparator.result_key"""
+    key = db.Column(db.String(64), primary_key=True)
+    body = db.deferred(db.Column(db.LargeBinary, nullable=False))  # zlib-compressed JSON response body
+    size = db.Column(db.Integer, nullable=False)  # compressed bytes, counted against RESULT_CACHE_MAX_MB
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+def ensure_schema():
+    """
+    Create missing tables and bring databases created by older versions up to date: add new
+    PLOSubmission columns and indexes, then backfill the summary columns of completed submissions
+    """
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    table = PLOSubmission.__table__
+    existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+    existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+    
+    with db.engine.begin() as connection:
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+    
+    # Backfill in batches so old databases never hold every result blob in memory at once
+    pending = [submission_id for (submission_id,) in db.session.query(PLOSubmission.id).filter(
+        PLOSubmission.status == 'completed', PLOSubmission.plo_count.is_(None))]
+    for start in range(0, len(pending), 100):
+        for submission in PLOSubmission.query.filter(PLOSubmission.id.in_(pending[start:start + 100])):
+            submission.store_results(json.loads(submission.comparison_results))
+        db.session.commit()
+
+@app.cli.command('ensure-schema')
+def ensure_schema_command():
+    """Create or upgrade the database schema (flask --app app ensure-schema)"""
+    ensure_schema()
 
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(Institution, int(user_id))
 
-# Initialize CPF Comparator
-cpf_comparator = CPFComparator()
+# CPF Comparator, built on first use so the app can serve pages before the model is loaded
+_cpf_comparator = None
+_cpf_comparator_lock = threading.Lock()
+
+def get_comparator():
+    """Return the shared CPFComparator, importing and constructing it on first use"""
+    global _cpf_comparator
+    if _cpf_comparator is None:
+        with _cpf_comparator_lock:
+            if _cpf_comparator is None:
+                started = time.perf_counter()
+                from cpf_comparison import CPFComparator
+                _cpf_comparator = CPFComparator()
+                app.config['COMPARATOR_LOAD_SECONDS'] = round(time.perf_counter() - started, 3)
+    return _cpf_comparator
+
+# Peer PLO index, opened on first use like the comparator
+_peer_index = None
+_peer_index_lock = threading.Lock()
+
+def get_peer_index():
+    """Return the shared PeerIndex over every stored institutional PLO"""
+    global _peer_index
+    if _peer_index is None:
+        with _peer_index_lock:
+            if _peer_index is None:
+                from peer_index import PeerIndex
+                _peer_index = PeerIndex()
+    return _peer_index
+
+def index_submission(submission, plos):
+    """Add a saved submission's PLOs to the peer index; a failure is logged, never raised"""
+    if not app.config['PEER_INDEX']:
+        return
+    try:
+        with stage_timer('peer_index'):
+            from peer_index import plo_vectors, vector_space
+            comparator = get_comparator()
+            get_peer_index().add(submission.id, plo_vectors(comparator, plos), vector_space(comparator))
+        if get_peer_index().needs_training():
+            train_peer_index(background=True)
+    except Exception:
+        app.logger.exception('Peer indexing failed for submission %s', submission.id)
+
+# Held while this process retrains the peer index, so saves never start a second training
+_peer_training_lock = threading.Lock()
+
+def train_peer_index(background=False):
+    """Retrain the peer index centroids (k-means), off the request thread when background is set"""
+    if background:
+        threading.Thread(target=train_peer_index, name='peer-index-train', daemon=True).start()
+        return
+    if not _peer_training_lock.acquire(blocking=False):
+        return
+    try:
+        with stage_timer('peer_index_train'):
+            get_peer_index().train()
+    except Exception:
+        app.logger.exception('Peer index training failed')
+    finally:
+        _peer_training_lock.release()
+
+def warm_up(background=False):
+    """Load the comparator (model, framework index) ahead of the first comparison"""
+    if background:
+        threading.Thread(target=warm_up, name='plo-warmup', daemon=True).start()
+        return
+    try:
+        get_comparator()
+    except Exception:
+        app.logger.exception('Comparator warm-up failed')
+
+# Set to the worker's pid once its warm-up has started (gunicorn forks workers from one master)
+_warm_up_pid = None
+
+@app.before_request
+def warm_up_worker():
+    """
+    With WARMUP_ON_START, warm up in the background once per worker process, unless the model was
+    loaded before the fork (gunicorn's master with PRELOAD_MODEL=1). gunicorn.conf.py calls this as
+    each worker starts; under other servers it runs on the first request
+    """
+    global _warm_up_pid
+    if not app.config['WARMUP_ON_START'] or _warm_up_pid == os.getpid() or _cpf_comparator is not None:
+        return
+    _warm_up_pid = os.getpid()
+    warm_up(background=True)
+
+def compare_for_storage(plo_batches, previous_results=None):
+    """
+    Run a comparison over batches of PLOs in the configured storage format (see RESULT_STORAGE).
+    With previous_results (an edited submission) only new or changed PLOs are scored.
+    """
+    if previous_results is not None:
+        results, _ = get_comparator().recompare_plos(
+            [plo for batch in plo_batches for plo in batch],
+            previous_results,
+            result_format=app.config['RESULT_STORAGE'],
+            top_k=app.config['RESULT_TOP_K']
+        )
+        return results
+    return get_comparator().compare_plo_batches(
+        plo_batches,
+        result_format=app.config['RESULT_STORAGE'],
+        top_k=app.config['RESULT_TOP_K']
+    )
+
+def run_comparison_job(submission_id):
+    """Background job: compare a pending submission's PLOs and store the results"""
+    # Claim the submission atomically so a job never runs twice
+    claimed = PLOSubmission.query.filter_by(id=submission_id, status='pending').update(
+        {'status': 'running', 'claimed_at': datetime.utcnow()})
+    db.session.commit()
+    if not claimed:
+        return
+    
+    submission = db.session.get(PLOSubmission, submission_id)
+    try:
+        # Edited submissions still hold their previous results, which the re-comparison reuses
+        previous_results = json.loads(submission.comparison_results) if submission.comparison_results else None
+        results = compare_for_storage([json.loads(submission.plos_data)], previous_results)
+        with stage_timer('store'):
+            submission.store_results(results)
+            db.session.commit()
+        index_submission(submission, json.loads(submission.plos_data))
+    except Exception:
+        app.logger.exception('Comparison failed for submission %s', submission_id)
+        db.session.rollback()
+        submission = db.session.get(PLOSubmission, submission_id)
+        submission.status = 'failed'
+    db.session.commit()
+
+# Background worker pool for COMPARISON_MODE=async
+comparison_queue = ComparisonQueue(app, run_comparison_job, max_workers=app.config['COMPARISON_WORKERS'])
+
+def _abandoned_jobs():
+    """Filter for running submissions whose worker has not finished within COMPARISON_JOB_TIMEOUT"""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['COMPARISON_JOB_TIMEOUT'])
+    return db.and_(PLOSubmission.status == 'running', db.or_(
+        PLOSubmission.claimed_at < cutoff,
+        db.and_(PLOSubmission.claimed_at.is_(None), PLOSubmission.submitted_at < cutoff)
+    ))
+
+def recover_comparison_jobs():
+    """
+    Jobs only live in the in-process queue of the web worker that accepted them, so a restart
+    or crash loses them. Queued submissions are enqueued again here (a job another worker still
+    holds is skipped by the atomic claim in run_comparison_job); running ones past the timeout
+    are marked failed so status polling ends.
+    """
+    PLOSubmission.query.filter(_abandoned_jobs()).update({'status': 'failed'}, synchronize_session=False)
+    db.session.commit()
+    for (submission_id,) in db.session.query(PLOSubmission.id).filter_by(status='pending').order_by(PLOSubmission.id):
+        comparison_queue.enqueue(submission_id)
+
+# Set to the worker's pid once it has recovered jobs (gunicorn forks workers from one master)
+_jobs_recovered_pid = None
+
+# Probes and scrapes are answered without doing the worker's start-up database work
+PROBE_ENDPOINTS = {'healthz', 'readyz', 'metrics'}
+
+def recover_jobs_once():
+    """
+    Recover comparison jobs once per worker process. gunicorn.conf.py calls this as each worker
+    starts; under other servers it runs before the first request that is not a probe
+    """
+    global _jobs_recovered_pid
+    if _jobs_recovered_pid == os.getpid():
+        return
+    _jobs_recovered_pid = os.getpid()
+    # Its own app context: post_fork runs outside any request
+    with app.app_context():
+        try:
+            recover_comparison_jobs()
+        except Exception:
+            app.logger.exception('Recovering comparison jobs failed')
+            db.session.rollback()
+
+@app.before_request
+def recover_jobs_before_request():
+    if request.endpoint not in PROBE_ENDPOINTS:
+        recover_jobs_once()
+
+def submit_comparison(plo_batches, submission_name, institution_id, background=None):
+    """
+    Create a submission from batches of PLOs and either compare it now or queue it.
+    Returns (submission, results or None when queued).
+    """
+    if background is None:
+        background = app.config['COMPARISON_MODE'] == 'async'
+    
+    submission = PLOSubmission(institution_id=institution_id, submission_name=submission_name)
+    
+    if background:
+        submission.plos_data = json.dumps([plo for batch in plo_batches for plo in batch])
+        submission.status = 'pending'
+        db.session.add(submission)
+        db.session.commit()
+        comparison_queue.enqueue(submission.id)
+        return submission, None
+    
+    # Score each batch as it is read, keeping the PLO text for the submission record
+    plos_list = []
+    def collect(batches):
+        for batch in batches:
+            plos_list.extend(batch)
+            yield batch
+    
+    results = compare_for_storage(collect(plo_batches))
+    with stage_timer('store'):
+        submission.plos_data = json.dumps(plos_list)
+        submission.store_results(results)
+        db.session.add(submission)
+        db.session.commit()
+    index_submission(submission, plos_list)
+    return submission, get_comparator().expand_results(results)
+
+def update_submission(submission, plos_list, submission_name=None, background=None):
+    """
+    Replace an existing submission's PLOs and re-compare incrementally against its stored results.
+    Returns (submission, results or None when queued).
+    """
+    if background is None:
+        background = app.config['COMPARISON_MODE'] == 'async'
+    
+    if submission_name:
+        submission.submission_name = submission_name
+    submission.plos_data = json.dumps(plos_list)
+    
+    if background:
+        submission.status = 'pending'
+        db.session.commit()
+        comparison_queue.enqueue(submission.id)
+        return submission, None
+    
+    previous_results = json.loads(submission.comparison_results) if submission.comparison_results else None
+    results = compare_for_storage([plos_list], previous_results)
+    with stage_timer('store'):
+        submission.store_results(results)
+        db.session.commit()
+    # Re-indexing supersedes the submission's previous PLOs in the peer index
+    index_submission(submission, plos_list)
+    return submission, get_comparator().expand_results(results)
+
+def cached_result(key):
+    """The stored response body for a result key, or None; a failure is logged and treated as a miss"""
+    try:
+        with stage_timer('result_cache'):
+            entry = db.session.get(CachedResult, key)
+            if entry is None:
+                return None
+            body = zlib.decompress(entry.body)
+            entry.last_used_at = datetime.utcnow()
+            db.session.commit()
+            return body
+    except Exception:
+        app.logger.exception('Result cache lookup failed')
+        db.session.rollback()
+        return None
+
+def cache_result(key, body):
+    """Store a response body, then evict least recently used entries over RESULT_CACHE_MAX_MB"""
+    max_bytes = app.config['RESULT_CACHE_MAX_BYTES']
+    try:
+        with stage_timer('result_cache'):
+            compressed = zlib.compress(body)
+            if len(compressed) > max_bytes:
+                return
+            db.session.merge(CachedResult(key=key, body=compressed, size=len(compressed)))
+            db.session.flush()
+            
+            total = db.session.query(db.func.coalesce(db.func.sum(CachedResult.size), 0)).scalar()
+            evicted = []
+            if total > max_bytes:
+                entries = db.session.query(CachedResult.key, CachedResult.size).order_by(CachedResult.last_used_at)
+                for evict_key, size in entries:
+                    if total <= max_bytes:
+                        break
+                    if evict_key != key:
+                        evicted.append(evict_key)
+                        total -= size
+            if evicted:
+                CachedResult.query.filter(CachedResult.key.in_(evicted)).delete(synchronize_session=False)
+            db.session.commit()
+    except Exception:
+        # e.g. a concurrent request stored the same key first
+        app.logger.exception('Result cache store failed')
+        db.session.rollback()
+
+def render_results(**context):
+    """Render results.html, timing the template (the crosswalk loops dominate for large submissions)"""
+    with stage_timer('render'):
+        return render_template('results.html', **context)
+
+def _embedding_cache_samples():
+    """Embedding cache statistics for /metrics, once the comparator is loaded"""
+    if _cpf_comparator is None or _cpf_comparator.embedding_cache is None:
+        return []
+    stats = _cpf_comparator.embedding_cache.stats()
+    return [
+        ('plo_embedding_cache_hits_total', 'counter', 'PLO embeddings served from memory', stats['hits']),
+        ('plo_embedding_cache_disk_hits_total', 'counter', 'PLO embeddings served from the SQLite tier', stats['disk_hits']),
+        ('plo_embedding_cache_misses_total', 'counter', 'PLO embeddings that had to be encoded', stats['misses']),
+        ('plo_embedding_cache_entries', 'gauge', 'PLO embeddings held in memory', stats['entries']),
+        ('plo_embedding_cache_bytes', 'gauge', 'Memory used by cached PLO embeddings', stats['bytes']),
+    ]
+
+REGISTRY.add_collector(_embedding_cache_samples)
+
+def _encoder_queue_samples():
+    """Encode requests waiting for a micro-batch (see encoders.MicroBatcher), once the comparator is loaded"""
+    if _cpf_comparator is None or not hasattr(_cpf_comparator.encoder, 'stats'):
+        return []
+    stats = _cpf_comparator.encoder.stats()
+    return [
+        ('plo_encoder_queue_requests', 'gauge', 'Encode requests waiting for a model call', stats['queued_requests']),
+        ('plo_encoder_queue_texts', 'gauge', 'PLOs waiting to be encoded', stats['queued_texts']),
+    ]
+
+REGISTRY.add_collector(_encoder_queue_samples)
+
+def _peer_index_samples():
+    """Peer index size for /metrics, once it has been opened"""
+    if _peer_index is None:
+        return []
+    stats = _peer_index.stats()
+    return [
+        ('plo_peer_index_vectors', 'gauge', 'Live PLO vectors in the peer index', stats['live_vectors']),
+        ('plo_peer_index_lists', 'gauge', 'IVF lists of the peer index (1 until trained)', stats['lists']),
+    ]
+
+REGISTRY.add_collector(_peer_index_samples)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Opt-in profiling of a single request: enable PROFILE_REQUESTS and add ?profile=1
+    if app.config['PROFILE_REQUESTS'] and request.args.get('profile') == '1':
+        import cProfile
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        path = os.path.join(
+            app.config['PROFILE_DIR'],
+            f"{request.endpoint or 'unknown'}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.prof"
+        )
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+        app.logger.info('Wrote request profile to %s', path)
+    
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown',
+                                method=request.method, status=response.status_code)
+    return response
 
 # Make enumerate available in templates
 with app.app_context():
@@ -61,6 +501,27 @@ with app.app_context():
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (per-process values)"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the web process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the comparator is loaded, so comparisons will not pay model start-up time"""
+    if _cpf_comparator is None:
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({
+        'status': 'ready',
+        'encoder': _cpf_comparator.encoder.name if _cpf_comparator.encoder else None,
+        'load_seconds': app.config.get('COMPARATOR_LOAD_SECONDS')
+    })
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -109,8 +570,33 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    submissions = PLOSubmission.query.filter_by(institution_id=current_user.id).order_by(PLOSubmission.submitted_at.desc()).all()
-    return render_template('dashboard.html', submissions=submissions)
+    # Keyset pagination: ?before=<id> lists the submissions older than that one, newest first
+    query = PLOSubmission.query.filter_by(institution_id=current_user.id)
+    before = request.args.get('before', type=int)
+    if before is not None:
+        anchor = db.session.query(PLOSubmission.submitted_at).filter_by(
+            id=before, institution_id=current_user.id).scalar()
+        if anchor is not None:
+            query = query.filter(db.or_(
+                PLOSubmission.submitted_at < anchor,
+                db.and_(PLOSubmission.submitted_at == anchor, PLOSubmission.id < before)
+            ))
+    page_size = app.config['DASHBOARD_PAGE_SIZE']
+    submissions = query.order_by(PLOSubmission.submitted_at.desc(), PLOSubmission.id.desc()).limit(page_size + 1).all()
+    next_before = submissions[page_size - 1].id if len(submissions) > page_size else None
+    submissions = submissions[:page_size]
+    
+    # Statistics over every submission, counted in the database rather than from the current page
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    total, completed, this_month = db.session.query(
+        db.func.count(PLOSubmission.id),
+        db.func.count(db.case((PLOSubmission.status == 'completed', 1))),
+        db.func.count(db.case((PLOSubmission.submitted_at >= month_start, 1)))
+    ).filter(PLOSubmission.institution_id == current_user.id).one()
+    stats = {'total': total, 'completed': completed, 'this_month': this_month}
+    
+    return render_template('dashboard.html', submissions=submissions, stats=stats,
+                           next_before=next_before, paged=before is not None)
 
 @app.route('/compare', methods=['GET', 'POST'])
 @login_required
@@ -126,21 +612,14 @@ def compare_plos():
             flash('Please enter at least one PLO')
             return redirect(url_for('compare_plos'))
         
-        # Perform comparison
-        results = cpf_comparator.compare_plos(plos_list)
+        # Perform comparison and save submission
+        submission, results = submit_comparison([plos_list], submission_name, current_user.id)
         
-        # Save submission
-        submission = PLOSubmission(
-            institution_id=current_user.id,
-            submission_name=submission_name,
-            plos_data=json.dumps(plos_list),
-            comparison_results=json.dumps(results),
-            status='completed'
-        )
-        db.session.add(submission)
-        db.session.commit()
+        if results is None:
+            flash(f'"{submission_name}" has been queued for analysis. Results will appear below when ready.')
+            return redirect(url_for('dashboard'))
         
-        return render_template('results.html', results=results, submission_name=submission_name)
+        return render_results(results=results, submission_name=submission_name)
     
     return render_template('compare.html')
 
@@ -167,82 +646,29 @@ def upload_file():
         
         if file:
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
             
-            # Read file and extract PLOs
+            # Stream PLOs straight from the upload in batches (no temp file, no full DataFrame)
             try:
-                plos_list = []
-                
-                if file_ext == '.csv':
-                    df = pd.read_csv(filepath)
-                    # Try common column names for PLOs
-                    plo_columns = ['PLO', 'Learning Outcome', 'Outcome', 'PLO Text', 'Description']
-                    plo_col = None
-                    for col in plo_columns:
-                        if col in df.columns:
-                            plo_col = col
-                            break
-                    
-                    if plo_col:
-                        plos_list = df[plo_col].dropna().astype(str).tolist()
-                    else:
-                        # Use first column if no PLO column found
-                        plos_list = df.iloc[:, 0].dropna().astype(str).tolist()
-                
-                elif file_ext in ['.xlsx', '.xls']:
-                    df = pd.read_excel(filepath)
-                    # Try common column names for PLOs
-                    plo_columns = ['PLO', 'Learning Outcome', 'Outcome', 'PLO Text', 'Description']
-                    plo_col = None
-                    for col in plo_columns:
-                        if col in df.columns:
-                            plo_col = col
-                            break
-                    
-                    if plo_col:
-                        plos_list = df[plo_col].dropna().astype(str).tolist()
-                    else:
-                        # Use first column if no PLO column found
-                        plos_list = df.iloc[:, 0].dropna().astype(str).tolist()
+                plo_batches = iter_plo_batches(file.stream, file_ext)
+                first_batch = next(plo_batches, None)
                 
-                elif file_ext == '.txt':
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        # Split by lines and filter out empty lines
-                        plos_list = [line.strip() for line in content.split('\n') if line.strip()]
-                
-                # Filter out empty strings and clean up
-                plos_list = [plo.strip() for plo in plos_list if plo.strip() and plo.strip() != 'nan']
-                
-                if not plos_list:
+                if not first_batch:
                     flash('No valid PLOs found in the uploaded file. Please check the file format.')
-                    os.remove(filepath)
                     return redirect(request.url)
                 
-                # Perform comparison
-                results = cpf_comparator.compare_plos(plos_list)
-                
-                # Save submission
-                submission = PLOSubmission(
-                    institution_id=current_user.id,
-                    submission_name=f"Upload: {filename}",
-                    plos_data=json.dumps(plos_list),
-                    comparison_results=json.dumps(results),
-                    status='completed'
+                # Perform comparison and save submission
+                submission, results = submit_comparison(
+                    itertools.chain([first_batch], plo_batches), f"Upload: {filename}", current_user.id
                 )
-                db.session.add(submission)
-                db.session.commit()
                 
-                # Clean up uploaded file
-                os.remove(filepath)
+                if results is None:
+                    flash(f'"Upload: {filename}" has been queued for analysis. Results will appear below when ready.')
+                    return redirect(url_for('dashboard'))
                 
-                return render_template('results.html', results=results, submission_name=f"Upload: {filename}")
+                return render_results(results=results, submission_name=f"Upload: {filename}")
                 
             except Exception as e:
-                # Clean up file on error
-                if os.path.exists(filepath):
-                    os.remove(filepath)
+                db.session.rollback()
                 flash(f'Error processing file: {str(e)}. Please ensure the file contains valid PLO data.')
                 return redirect(request.url)
         else:
@@ -261,13 +687,296 @@ def view_submission(submission_id):
         flash('Access denied')
         return redirect(url_for('dashboard'))
     
-    results = json.loads(submission.comparison_results)
-    plos_data = json.loads(submission.plos_data)
+    if submission.status != 'completed':
+        flash('This submission is still being processed' if submission.status in ('pending', 'running')
+              else 'This submission could not be processed')
+        return redirect(url_for('dashboard'))
     
-    return render_template('submission_detail.html', 
-                         submission=submission, 
-                         results=results, 
-                         plos_data=plos_data)
+    stored = json.loads(submission.comparison_results)
+    
+    from cpf_comparison import StaleResultsError
+    try:
+        # Large compact submissions ship the summary only; the page fetches the crosswalk and details in pages
+        if _render_lazily(stored):
+            return render_results(submission=submission,
+                                  results=get_comparator().summary_view(stored),
+                                  submission_name=submission.submission_name,
+                                  lazy=True)
+        
+        results = get_comparator().expand_results(stored)
+    except StaleResultsError:
+        # Saving the submission again re-scores every PLO against the current framework
+        flash('These results are from an older version of the framework. Save the submission to re-run the comparison.')
+        return redirect(url_for('edit_submission', submission_id=submission.id))
+    
+    return render_results(submission=submission, 
+                          results=results, 
+                          submission_name=submission.submission_name)
+
+def _render_lazily(stored):
+    """Whether a stored result is rendered lazily (?lazy=1 / ?lazy=0 override LAZY_RESULTS_MIN_PLOS)"""
+    if stored.get('format') != 'compact':
+        return False
+    if request.args.get('lazy') in ('0', '1'):
+        return request.args['lazy'] == '1'
+    return len(stored['institutional_plos']) >= app.config['LAZY_RESULTS_MIN_PLOS']
+
+@app.route('/submission/<int:submission_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_submission(submission_id):
+    submission = PLOSubmission.query.get_or_404(submission_id)
+    
+    # Ensure user can only edit their own submissions
+    if submission.institution_id != current_user.id:
+        flash('Access denied')
+        return redirect(url_for('dashboard'))
+    
+    if submission.status in ('pending', 'running'):
+        flash('This submission is still being processed')
+        return redirect(url_for('dashboard'))
+    
+    if request.method == 'POST':
+        plos_list = [plo.strip() for plo in request.form['plos_text'].split('\n') if plo.strip()]
+        
+        if not plos_list:
+            flash('Please enter at least one PLO')
+            return redirect(url_for('edit_submission', submission_id=submission.id))
+        
+        # Only new or changed PLOs are scored; unchanged ones reuse the stored results
+        submission, results = update_submission(submission, plos_list, request.form.get('submission_name'))
+        
+        if results is None:
+            flash(f'"{submission.submission_name}" has been queued for re-analysis. Results will appear below when ready.')
+            return redirect(url_for('dashboard'))
+        
+        return render_results(submission=submission, results=results,
+                              submission_name=submission.submission_name)
+    
+    return render_template('compare.html', submission=submission,
+                           plos_text='\n'.join(json.loads(submission.plos_data)))
+
+def _get_own_submission(submission_id):
+    """Fetch a submission for the API, or an error response if it does not belong to the caller"""
+    submission = db.session.get(PLOSubmission, submission_id)
+    if submission is None or submission.institution_id != current_user.id:
+        return None, (jsonify({'error': 'Submission not found'}), 404)
+    return submission, None
+
+@app.route('/api/submissions/<int:submission_id>/status')
+@login_required
+def api_submission_status(submission_id):
+    submission, error = _get_own_submission(submission_id)
+    if error:
+        return error
+    
+    # A job whose worker died never finishes on its own
+    if PLOSubmission.query.filter(PLOSubmission.id == submission.id, _abandoned_jobs()).update(
+            {'status': 'failed'}, synchronize_session=False):
+        db.session.commit()
+        db.session.refresh(submission)
+    
+    return jsonify({
+        'submission_id': submission.id,
+        'status': submission.status,
+        'result_url': url_for('api_submission_result', submission_id=submission.id)
+    })
+
+@app.route('/api/submissions/<int:submission_id>/result')
+@login_required
+def api_submission_result(submission_id):
+    submission, error = _get_own_submission(submission_id)
+    if error:
+        return error
+    
+    if submission.status in ('pending', 'running'):
+        return jsonify({'submission_id': submission.id, 'status': submission.status}), 202
+    if submission.status != 'completed':
+        return jsonify({'submission_id': submission.id, 'status': submission.status,
+                        'error': 'Comparison failed'}), 500
+    
+    # Stored results are returned in the full shape unless the caller asks for the compact form
+    if request.args.get('format') == 'compact':
+        return app.response_class(submission.comparison_results, mimetype='application/json')
+    from cpf_comparison import StaleResultsError
+    try:
+        return jsonify(get_comparator().expand_results(json.loads(submission.comparison_results)))
+    except StaleResultsError as e:
+        return jsonify({'error': str(e)}), 409
+
+def _get_compact_results(submission_id):
+    """Stored compact results of a completed submission, or an error response"""
+    submission, error = _get_own_submission(submission_id)
+    if error:
+        return None, error
+    if submission.status != 'completed':
+        return None, (jsonify({'submission_id': submission.id, 'status': submission.status}), 409)
+    
+    stored = json.loads(submission.comparison_results)
+    if stored.get('format') != 'compact':
+        return None, (jsonify({'error': 'Paged views need results stored in the compact format'}), 409)
+    return stored, None
+
+def _int_arg(name, default, maximum=None):
+    value = request.args.get(name, default, type=int)
+    return min(value, maximum) if maximum is not None else value
+
+@app.route('/api/submissions/<int:submission_id>/crosswalk')
+@login_required
+def api_submission_crosswalk(submission_id):
+    """A tile of the crosswalk: framework statements (rows) x institutional PLOs (columns)"""
+    stored, error = _get_compact_results(submission_id)
+    if error:
+        return error
+    
+    cpf_start = _int_arg('cpf_start', 0)
+    plo_start = _int_arg('plo_start', 0)
+    from cpf_comparison import StaleResultsError
+    try:
+        tile = get_comparator().crosswalk_tile(
+            stored,
+            cpf_start, cpf_start + _int_arg('cpf_count', 200, maximum=500),
+            plo_start, plo_start + _int_arg('plo_count', 25, maximum=200)
+        )
+    except StaleResultsError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(tile)
+
+@app.route('/api/submissions/<int:submission_id>/details')
+@login_required
+def api_submission_details(submission_id):
+    """A page of per-PLO detailed results (best matches first)"""
+    stored, error = _get_compact_results(submission_id)
+    if error:
+        return error
+    
+    start = _int_arg('start', 0)
+    from cpf_comparison import StaleResultsError
+    try:
+        page = get_comparator().detail_page(
+            stored, start, start + _int_arg('count', 20, maximum=200), _int_arg('matches', 5, maximum=50)
+        )
+    except StaleResultsError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(page)
+
+@app.route('/api/submissions/<int:submission_id>/export')
+@login_required
+def api_submission_export(submission_id):
+    """Download a submission's results as CSV, Parquet or Arrow, streamed as they are generated"""
+    from result_export import EXPORT_FORMATS, detailed_rows, from_results, iter_csv, iter_export
+    
+    submission, error = _get_own_submission(submission_id)
+    if error:
+        return error
+    if submission.status != 'completed':
+        return jsonify({'submission_id': submission.id, 'status': submission.status}), 409
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    stored = json.loads(submission.comparison_results)
+    try:
+        if stored.get('format') == 'compact':
+            # Rows are generated from the stored score array, never from the expanded results
+            chunks = iter_export([from_results(get_comparator(), stored, submission.submission_name)], export_format)
+        elif export_format == 'csv':
+            chunks = iter_csv(detailed_rows(stored))
+        else:
+            return jsonify({'error': 'Parquet and Arrow exports need results stored in the compact format'}), 409
+    except ImportError as e:
+        return jsonify({'error': str(e)}), 501
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return _export_response(chunks, export_format, submission.submission_name)
+
+def _export_response(chunks, export_format, name):
+    """Streamed download of export chunks"""
+    from result_export import EXPORT_FORMATS
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = app.response_class(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{secure_filename(name) or "results"}.{extension}"'
+    return response
+
+@app.route('/api/submissions/<int:submission_id>/peers')
+@login_required
+def api_submission_peers(submission_id):
+    """
+    The most similar PLOs from every other stored submission, per PLO of this one, plus the
+    submissions (peer programs) that turn up most often. ?plo=<position> restricts the search to one PLO.
+    """
+    from peer_index import MAX_LISTS, SpaceMismatchError, plo_vectors, vector_space
+    
+    submission, error = _get_own_submission(submission_id)
+    if error:
+        return error
+    
+    plos = json.loads(submission.plos_data)
+    positions = list(range(len(plos)))
+    if request.args.get('plo') is not None:
+        position = request.args.get('plo', type=int)
+        if position is None or not 0 <= position < len(plos):
+            return jsonify({'error': 'plo must be the position of one of the submission\'s PLOs'}), 400
+        positions = [position]
+    
+    k = max(1, _int_arg('k', 10, maximum=50))
+    # Lists probed per PLO; more than the index has would only scan them all
+    nprobe = max(1, _int_arg('nprobe', get_peer_index().nprobe, maximum=MAX_LISTS))
+    comparator = get_comparator()
+    try:
+        with stage_timer('peer_search'):
+            entries, scores = get_peer_index().query(
+                plo_vectors(comparator, [plos[p] for p in positions]), k,
+                exclude_submission=submission.id, nprobe=nprobe,
+                space=vector_space(comparator)
+            )
+    except SpaceMismatchError as e:
+        # The encoder changed since the index was built
+        return jsonify({'error': str(e)}), 409
+    
+    # Resolve (submission id, position) hits to text, loading each peer submission once
+    peer_ids = sorted({int(peer_id) for peer_id in entries[:, :, 0].ravel() if peer_id >= 0})
+    peers = {peer.id: peer for peer in PLOSubmission.query.filter(PLOSubmission.id.in_(peer_ids))} if peer_ids else {}
+    peer_plos = {peer_id: json.loads(peer.plos_data) for peer_id, peer in peers.items()}
+    
+    results = []
+    programs = {}
+    for row, position in enumerate(positions):
+        matches = []
+        for (peer_id, peer_position), score in zip(entries[row].tolist(), scores[row].tolist()):
+            # Hits can outlive a deleted submission or point past an edited one's PLOs
+            if peer_id not in peers or peer_position >= len(peer_plos[peer_id]):
+                continue
+            peer = peers[peer_id]
+            matches.append({
+                'submission_id': peer_id,
+                'submission_name': peer.submission_name,
+                'institution': peer.institution.name,
+                'plo': peer_plos[peer_id][peer_position],
+                'similarity': round(score, 3)
+            })
+            program = programs.setdefault(peer_id, {'submission_id': peer_id,
+                                                    'submission_name': peer.submission_name,
+                                                    'institution': peer.institution.name,
+                                                    'matched_plos': set(), 'similarities': []})
+            program['matched_plos'].add(position)
+            program['similarities'].append(score)
+        results.append({'position': position, 'plo': plos[position], 'matches': matches})
+    
+    peer_programs = [
+        {
+            'submission_id': program['submission_id'],
+            'submission_name': program['submission_name'],
+            'institution': program['institution'],
+            'matched_plos': len(program['matched_plos']),
+            'mean_similarity': round(sum(program['similarities']) / len(program['similarities']), 3)
+        }
+        for program in programs.values()
+    ]
+    peer_programs.sort(key=lambda program: (-program['matched_plos'], -program['mean_similarity']))
+    
+    return jsonify({'submission_id': submission.id, 'plos': results, 'peer_programs': peer_programs[:k]})
 
 @app.route('/api/compare', methods=['POST'])
 def api_compare():
@@ -277,12 +986,110 @@ def api_compare():
     if not plos:
         return jsonify({'error': 'No PLOs provided'}), 400
     
-    results = cpf_comparator.compare_plos(plos)
-    return jsonify(results)
+    # Background mode: queue the job and let the caller poll for the result
+    if data.get('async'):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Log in to queue background comparisons'}), 401
+        
+        submission, _ = submit_comparison([plos], data.get('submission_name') or 'API submission',
+                                          current_user.id, background=True)
+        return jsonify({
+            'submission_id': submission.id,
+            'status': submission.status,
+            'status_url': url_for('api_submission_status', submission_id=submission.id),
+            'result_url': url_for('api_submission_result', submission_id=submission.id)
+        }), 202
+    
+    # Several frameworks: the PLOs are encoded once and scored against each framework's index
+    if data.get('frameworks'):
+        try:
+            results = get_comparator().compare_with_other_frameworks(plos, data['frameworks'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(results)
+    
+    # Results depend only on the key (PLOs, framework version, encoder, thresholds), which is also the ETag
+    comparator = get_comparator()
+    key = comparator.result_key(plos)
+    if request.if_none_match.contains(key):
+        RESULT_CACHE_LOOKUPS.inc(result='not_modified')
+        response = app.response_class(status=304)
+        response.set_etag(key)
+        return response
+    
+    body = cached_result(key) if app.config['RESULT_CACHE'] else None
+    if body is not None:
+        RESULT_CACHE_LOOKUPS.inc(result='hit')
+        response = app.response_class(body, mimetype='application/json')
+    else:
+        RESULT_CACHE_LOOKUPS.inc(result='miss')
+        response = jsonify(comparator.compare_plos(plos))
+        if app.config['RESULT_CACHE']:
+            cache_result(key, response.get_data())
+    response.set_etag(key)
+    return response
+
+@app.route('/api/frameworks')
+def api_frameworks():
+    """List the frameworks that /api/compare can score against"""
+    from framework_registry import get_registry
+    registry = get_registry()
+    return jsonify([registry.get(key).describe() for key in registry.keys()])
+
+@app.route('/api/compare/bulk', methods=['POST'])
+def api_compare_bulk():
+    """Score many named programs in one call, streaming one NDJSON line per program"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        programs = normalize_programs(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not programs:
+        return jsonify({'error': 'No programs provided'}), 400
+    
+    result_format = data.get('format', 'full') if isinstance(data, dict) else 'full'
+    if result_format not in ('full', 'compact'):
+        return jsonify({'error': "format must be 'full' or 'compact'"}), 400
+    top_k = app.config['RESULT_TOP_K']
+    if isinstance(data, dict) and 'top_k' in data:
+        top_k = data['top_k']
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+            return jsonify({'error': 'top_k must be a positive integer'}), 400
+        # Capped like the per-PLO match count of the paged result endpoints
+        from cpf_comparison import MAX_TOP_K
+        top_k = min(top_k, MAX_TOP_K)
+    
+    # A flat export (one row per PLO pair, with a Program column) instead of NDJSON results
+    export_format = data.get('export') if isinstance(data, dict) else None
+    if export_format:
+        from result_export import EXPORT_FORMATS, iter_export, scored_programs
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"export must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        try:
+            chunks = iter_export(scored_programs(get_comparator(), programs), export_format, with_program=True)
+        except ImportError as e:
+            return jsonify({'error': str(e)}), 501
+        return _export_response(chunks, export_format, 'bulk_comparison')
+    
+    def generate():
+        # All non-empty programs are scored together as one stacked matrix
+        scored = get_comparator().compare_programs(
+            [(name, plos) for name, plos in programs if plos], result_format=result_format, top_k=top_k
+        )
+        for name, plos in programs:
+            if not plos:
+                yield json.dumps({'program': name, 'error': 'No PLOs provided'}) + '\n'
+                continue
+            _, results = next(scored)
+            yield json.dumps({'program': name, 'results': results}) + '\n'
+    
+    return app.response_class(generate(), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        ensure_schema()
     # Run on all network interfaces for local network sharing
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,134 @@
+"""
+Throughput and latency of concurrent encode requests with and without micro-batching.
+
+Client threads each send --requests encode calls of --plos PLOs (drawn from the realistic corpus)
+to one shared encoder, as threaded gunicorn workers do. Each mode reports requests per second
+and p50/p99 latency:
+  - direct: every thread calls the encoder itself, so calls contend for the same model
+  - window=<ms>: calls go through an encoders.MicroBatcher with that window
+
+--backend synthetic (the default, for machines without a model) uses a CPU-bound stand-in with a
+fixed per-call cost plus a per-text cost, like a transformer forward pass. torch or onnx use the
+real model. Batched embeddings are checked against direct ones.
+
+Usage:
+    python benchmarks/bench_micro_batching.py [--backend synthetic] [--threads 8] [--windows 2 5 10] [-o report.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SyntheticEncoder:
+    """Deterministic CPU-bound encoder: per-call setup work plus a small MLP per text"""
+    name = 'synthetic'
+
+    def __init__(self, dim=384, layers=4, call_cost=256):
+        rng = np.random.default_rng(0)
+        self.weights = [rng.standard_normal((dim, dim)).astype(np.float32) / np.sqrt(dim) for _ in range(layers)]
+        self.setup = rng.standard_normal((call_cost, call_cost)).astype(np.float32)
+
+    def encode(self, texts):
+        # Stands in for tokenizer and graph launch overhead, paid once per call
+        np.linalg.qr(self.setup)
+        dim = self.weights[0].shape[0]
+        x = np.stack([np.random.default_rng(zlib.crc32(t.encode('utf-8'))).standard_normal(dim).astype(np.float32)
+                      for t in texts])
+        for w in self.weights:
+            x = np.tanh(x @ w)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def build_encoder(backend):
+    if backend == 'synthetic':
+        return SyntheticEncoder()
+    from encoders import OnnxEncoder, SentenceTransformerEncoder
+    return SentenceTransformerEncoder() if backend == 'torch' else OnnxEncoder()
+
+
+def run_load(encoder, workloads):
+    """Run each thread's list of requests concurrently; returns (seconds, latencies, outputs)"""
+    latencies = [[] for _ in workloads]
+    outputs = [[] for _ in workloads]
+    start = threading.Barrier(len(workloads) + 1)
+
+    def client(i):
+        start.wait()
+        for texts in workloads[i]:
+            started = time.perf_counter()
+            outputs[i].append(encoder.encode(texts))
+            latencies[i].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(workloads))]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, [l for ls in latencies for l in ls], outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['synthetic', 'torch', 'onnx'], default='synthetic')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=20, help='Requests per thread')
+    parser.add_argument('--plos', type=int, default=12, help='PLOs per request')
+    parser.add_argument('--windows', nargs='+', type=float, default=[2, 5, 10], help='Batching windows in ms')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import corpus
+    from encoders import MicroBatcher
+
+    encoder = build_encoder(args.backend)
+    plos = corpus.realistic_plos(args.threads * args.requests * args.plos, seed=7)
+    workloads = [[plos[(t * args.requests + r) * args.plos:(t * args.requests + r + 1) * args.plos]
+                  for r in range(args.requests)] for t in range(args.threads)]
+    encoder.encode(plos[:args.plos])
+
+    modes = [('direct', encoder)] + [(f'window={w:g}ms', MicroBatcher(encoder, window_ms=w, max_batch=args.max_batch))
+                                     for w in args.windows]
+    runs = []
+    reference = None
+    for mode, mode_encoder in modes:
+        seconds, latencies, outputs = run_load(mode_encoder, workloads)
+        embeddings = np.vstack([e for thread_outputs in outputs for e in thread_outputs])
+        if reference is None:
+            reference = embeddings
+        run = {
+            'mode': mode,
+            'requests_per_second': len(latencies) / seconds,
+            'p50_ms': 1000 * float(np.percentile(latencies, 50)),
+            'p99_ms': 1000 * float(np.percentile(latencies, 99)),
+            'max_abs_diff_vs_direct': float(np.abs(embeddings - reference).max())
+        }
+        runs.append(run)
+        print(f"{mode:>14}: {run['requests_per_second']:.1f} req/s, p50 {run['p50_ms']:.1f}ms, "
+              f"p99 {run['p99_ms']:.1f}ms, max diff {run['max_abs_diff_vs_direct']:.1e}", file=sys.stderr)
+
+    report = {'backend': args.backend, 'threads': args.threads, 'requests': args.requests, 'plos': args.plos,
+              'cpu_count': os.cpu_count(), 'runs': runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
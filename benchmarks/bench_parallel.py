@@ -0,0 +1,96 @@
+"""
+Scaling of process-pool scoring (parallel_scoring.py) with the number of workers.
+
+For every worker count, a fresh interpreter with SCORING_WORKERS set runs compare_plos on the same
+corpus (after a warm-up comparison that starts the pool) and reports the best of --repeat timings.
+Every run also hashes its results, and the report flags any worker count whose results differ
+from the serial (1 worker) run, which must never happen.
+
+Usage:
+    python benchmarks/bench_parallel.py [--plos 5000] [--workers 1 2 4 8 16] [--chunk-size 500]
+                                        [--backend lexical] [--format compact] [-o report.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_worker(backend, plo_count, result_format, repeat):
+    """Time compare_plos in this process (SCORING_WORKERS comes from the environment) and print JSON"""
+    import corpus
+    from cpf_comparison import CPFComparator
+
+    comparator = CPFComparator(encoder_backend=backend)
+    plos = corpus.realistic_plos(plo_count, seed=plo_count)
+
+    # Start the pool (and the workers' comparators) outside the timed runs
+    comparator.compare_plos(corpus.realistic_plos(plo_count, seed=1), result_format=result_format)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = comparator.compare_plos(plos, result_format=result_format)
+        timings.append(time.perf_counter() - started)
+
+    print(json.dumps({
+        'workers': int(os.environ.get('SCORING_WORKERS', 1)),
+        'seconds': min(timings),
+        'results_sha256': hashlib.sha256(json.dumps(results, sort_keys=True).encode('utf-8')).hexdigest()
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plos', type=int, default=5000)
+    parser.add_argument('--workers', nargs='+', type=int,
+                        default=sorted({1, 2, 4, 8, 16} & set(range(1, (os.cpu_count() or 1) + 1))))
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--backend', default='lexical')
+    parser.add_argument('--format', choices=['full', 'compact'], default='compact')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.worker:
+        run_worker(args.backend, args.plos, args.format, args.repeat)
+        return 0
+
+    workers = sorted(set([1] + args.workers))
+    runs = []
+    for count in workers:
+        env = dict(os.environ, SCORING_WORKERS=str(count), SCORING_CHUNK_SIZE=str(args.chunk_size))
+        command = [sys.executable, os.path.abspath(__file__), '--worker', '--plos', str(args.plos),
+                   '--backend', args.backend, '--format', args.format, '--repeat', str(args.repeat)]
+        output = subprocess.run(command, cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    serial = runs[0]
+    for run in runs:
+        run['speedup'] = serial['seconds'] / run['seconds']
+        run['efficiency'] = run['speedup'] / run['workers']
+        run['identical_to_serial'] = run['results_sha256'] == serial['results_sha256']
+        print(f"{run['workers']:>3} workers: {run['seconds']:.3f}s, speed-up {run['speedup']:.2f}x "
+              f"({run['efficiency']:.0%} per core), identical: {run['identical_to_serial']}", file=sys.stderr)
+
+    report = {'plos': args.plos, 'backend': args.backend, 'format': args.format, 'chunk_size': args.chunk_size,
+              'cpu_count': os.cpu_count(), 'runs': runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if all(run['identical_to_serial'] for run in runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
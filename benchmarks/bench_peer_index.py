@@ -0,0 +1,104 @@
+"""
+Peer index benchmark: IVF query latency and recall against a brute-force scan of the pool.
+
+The pool is filled one 50-PLO submission at a time (as the app does when submissions are saved),
+from realistic PLO text hashed into key-term vectors (the lexical backend's space) or, with
+--backend torch/onnx, from sentence embeddings. Each size then reports:
+  - insert_seconds / train_seconds: total time of the incremental inserts, then of training the lists
+  - ivf_ms / exact_ms: per-query latency of the index and of a dense scan of every vector
+  - recall_at_k: share of the exact top-k the index returns, per --nprobe value
+
+Usage:
+    python benchmarks/bench_peer_index.py [--sizes 10000 100000 300000] [--nprobe 8 16 32] [-o report.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SUBMISSION_SIZE = 50
+
+
+def run(size, backend, nprobes, k, queries, train_min):
+    import corpus
+    from cpf_comparison import CPFComparator
+    from peer_index import PeerIndex, plo_vectors, vector_space
+
+    comparator = CPFComparator(encoder_backend=backend)
+    plos = corpus.realistic_plos(size + queries, seed=size)
+    vectors = plo_vectors(comparator, plos)
+    pool, query_vectors = vectors[:size], vectors[size:]
+
+    directory = tempfile.mkdtemp(prefix='peer-index-')
+    try:
+        index = PeerIndex(directory, train_min=train_min)
+        started = time.perf_counter()
+        for submission_id, start in enumerate(range(0, size, SUBMISSION_SIZE)):
+            index.add(submission_id, pool[start:start + SUBMISSION_SIZE], vector_space(comparator))
+        insert_seconds = time.perf_counter() - started
+
+        # The app retrains in the background once the pool outgrows the centroids
+        started = time.perf_counter()
+        if index.needs_training():
+            index.train()
+        train_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        exact_scores = np.sort(query_vectors @ pool.T, axis=1)[:, ::-1][:, :k]
+        exact_ms = 1000 * (time.perf_counter() - started) / queries
+
+        by_nprobe = {}
+        for nprobe in nprobes:
+            started = time.perf_counter()
+            _, scores = index.query(query_vectors, k, nprobe=nprobe)
+            seconds = time.perf_counter() - started
+            # Duplicate PLOs make row identities ambiguous, so a hit is any score within the exact top-k
+            found = scores >= exact_scores[:, -1:] - 1e-5
+            by_nprobe[nprobe] = {'ivf_ms': 1000 * seconds / queries, 'recall_at_k': float(found.mean())}
+
+        return {'pool': size, 'space': vector_space(comparator), 'stats': index.stats(),
+                'insert_seconds': insert_seconds, 'train_seconds': train_seconds, 'exact_ms': exact_ms, 'nprobe': by_nprobe}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 300000])
+    parser.add_argument('--backend', default='lexical', help='Encoder backend providing the vectors')
+    parser.add_argument('--nprobe', nargs='+', type=int, default=[4, 16, 64])
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--train-min', type=int, default=20000, help='Pool size at which the IVF lists are trained')
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    runs = []
+    for size in args.sizes:
+        result = run(size, args.backend, args.nprobe, args.k, args.queries, args.train_min)
+        runs.append(result)
+        summary = ' '.join(f"nprobe={n}: {r['ivf_ms']:.2f}ms recall={r['recall_at_k']:.3f}"
+                           for n, r in result['nprobe'].items())
+        print(f"{size}: {result['stats']['lists']} lists, exact {result['exact_ms']:.2f}ms/query, {summary}",
+              file=sys.stderr)
+
+    text = json.dumps({'runs': runs}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Stage-by-stage benchmark of the comparison pipeline.
+
+For every backend x corpus x size, a fresh interpreter runs each stage of
+CPFComparator.compare_plos on its own:
+  - features: key terms and Bloom masks of the institutional PLOs (FeatureStore)
+  - embedding: encoding the PLOs (transformer backends only; bypasses the embedding cache)
+  - similarity: the institutional x framework score matrix
+  - summary: theme/heading statistics and recommendations
+  - detailed_results / crosswalk: the full result views
+  - compact: the storage format
+  - export_json / export_csv: CPFComparator.export_results on the full results
+  - export_csv_stream: the streamed CSV download, generated from the score matrix (result_export)
+Each stage reports wall time (best of --repeat), pairs/second and its peak traced allocation
+(a separate tracemalloc pass, so tracing does not distort the timings). Runs also record the
+process's peak RSS.
+
+The JSON report includes the git commit, so reports from different commits can be compared:
+    python benchmarks/bench_pipeline.py -o before.json
+    python benchmarks/bench_pipeline.py -o after.json --baseline before.json
+
+Usage:
+    python benchmarks/bench_pipeline.py [--backends lexical torch] [--corpora synthetic realistic]
+                                        [--sizes 10 100 1000 10000] [--repeat 3] [-o report.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def stage_functions(comparator, plos):
+    """The pipeline as a list of (stage, fn); each fn takes and extends a dict of intermediate state"""
+    from cpf_comparison import DEFAULT_TOP_K
+    from plo_features import FeatureStore
+    from result_export import ScoredProgram, iter_export
+
+    def features(state):
+        state['features'] = FeatureStore(plos)
+
+    def embedding(state):
+        state['embeddings'] = comparator.encoder.encode(plos)
+
+    def similarity(state):
+        if comparator.encoder:
+            state['scores'] = state['embeddings'] @ comparator.cpf_embeddings.T
+        else:
+            state['scores'] = comparator.lexical_index.similarity_from_terms(state['features'].terms)
+
+    def summary(state):
+        state['results'] = comparator._summarize(state['scores'])
+
+    def detailed_results(state):
+        state['bloom'] = state['features'].bloom_alignment(comparator.cpf_features)
+        state['results']['detailed_results'] = comparator._detailed_results(
+            plos, state['scores'], state['features'], state['bloom']
+        )
+
+    def crosswalk(state):
+        state['results']['crosswalk_matrix'] = comparator._crosswalk_matrix(plos, state['scores'], state['bloom'])
+
+    def compact(state):
+        comparator._build_compact_results(plos, state['scores'], state['features'], DEFAULT_TOP_K)
+
+    def export_json(state):
+        comparator.export_results(state['results'], 'json')
+
+    def export_csv(state):
+        comparator.export_results(state['results'], 'csv')
+
+    def export_csv_stream(state):
+        program = ScoredProgram(None, comparator, plos, state['scores'], state['features'])
+        for _ in iter_export([program], 'csv'):
+            pass
+
+    stages = [('features', features)]
+    if comparator.encoder:
+        stages.append(('embedding', embedding))
+    stages += [('similarity', similarity), ('summary', summary), ('detailed_results', detailed_results),
+               ('crosswalk', crosswalk), ('compact', compact), ('export_json', export_json),
+               ('export_csv', export_csv), ('export_csv_stream', export_csv_stream)]
+    return stages
+
+
+def run_pipeline(stages, traced=False):
+    """Run every stage once; returns {stage: seconds} or {stage: peak traced MB}"""
+    state = {}
+    measurements = {}
+    for name, fn in stages:
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+            fn(state)
+            measurements[name] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        else:
+            started = time.perf_counter()
+            fn(state)
+            measurements[name] = time.perf_counter() - started
+    return measurements
+
+
+def run_worker(backend, corpus, size, repeat, memory):
+    """Benchmark one configuration in this process and print its JSON record"""
+    import corpus as corpora
+    from cpf_comparison import CPFComparator
+
+    plos = (corpora.synthetic_plos if corpus == 'synthetic' else corpora.realistic_plos)(size, seed=size)
+
+    started = time.perf_counter()
+    try:
+        comparator = CPFComparator(encoder_backend=backend)
+    except (ImportError, FileNotFoundError) as e:
+        # e.g. torch or onnxruntime not installed, or the ONNX graph not exported
+        print(json.dumps({'backend': backend, 'corpus': corpus, 'plos': size, 'skipped': str(e)}))
+        return
+    setup_seconds = time.perf_counter() - started
+
+    stages = stage_functions(comparator, plos)
+    if comparator.encoder:
+        comparator.encoder.encode(plos[:8])  # warm-up
+
+    timings = [run_pipeline(stages) for _ in range(repeat)]
+    peaks = run_pipeline(stages, traced=True) if memory else {}
+
+    pairs = len(plos) * len(comparator.flattened_cpf)
+    stage_report = {}
+    for name, _ in stages:
+        seconds = min(run[name] for run in timings)
+        stage_report[name] = {
+            'seconds': seconds,
+            'pairs_per_second': pairs / seconds if seconds else None,
+            'peak_mb': peaks.get(name)
+        }
+    total = sum(stage['seconds'] for stage in stage_report.values())
+
+    print(json.dumps({
+        'backend': backend,
+        'encoder': comparator.encoder.name if comparator.encoder else None,
+        'corpus': corpus,
+        'plos': len(plos),
+        'framework_statements': len(comparator.flattened_cpf),
+        'pairs': pairs,
+        'setup_seconds': setup_seconds,
+        'stages': stage_report,
+        'total_seconds': total,
+        'pairs_per_second': pairs / total if total else None,
+        'peak_rss_mb': peak_rss_mb()
+    }))
+
+
+def environment():
+    """What a report was measured on"""
+    import numpy as np
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def run_key(run):
+    return (run['backend'], run['corpus'], run['plos'])
+
+
+def print_comparison(report, baseline):
+    """Per-stage speed-up of this report over a baseline report (>1 is faster)"""
+    previous = {run_key(run): run for run in baseline['runs'] if 'stages' in run}
+    print(f"Compared with {baseline['environment'].get('commit')} (speed-up, >1 is faster):", file=sys.stderr)
+    for run in report['runs']:
+        old = previous.get(run_key(run))
+        if 'stages' not in run or old is None:
+            continue
+        speedups = [
+            f"{name}={old['stages'][name]['seconds'] / stage['seconds']:.2f}x"
+            for name, stage in run['stages'].items()
+            if name in old['stages'] and stage['seconds']
+        ]
+        print(f"  {run['backend']}/{run['corpus']}/{run['plos']}: "
+              f"total={old['total_seconds'] / run['total_seconds']:.2f}x " + ' '.join(speedups), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['lexical', 'torch'],
+                        help='Encoder backends (lexical, torch, onnx)')
+    parser.add_argument('--corpora', nargs='+', default=['synthetic', 'realistic'], choices=['synthetic', 'realistic'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per configuration (best is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    parser.add_argument('--worker', nargs=3, metavar=('BACKEND', 'CORPUS', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        backend, corpus, size = args.worker
+        run_worker(backend, corpus, int(size), args.repeat, not args.no_memory)
+        return 0
+
+    runs = []
+    for backend in args.backends:
+        for corpus in args.corpora:
+            for size in args.sizes:
+                command = [sys.executable, os.path.abspath(__file__), '--worker', backend, corpus, str(size),
+                           '--repeat', str(args.repeat)] + (['--no-memory'] if args.no_memory else [])
+                output = subprocess.run(command, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+                run = json.loads(output.strip().splitlines()[-1])
+                runs.append(run)
+                if 'stages' in run:
+                    print(f"{backend}/{corpus}/{size}: {run['total_seconds']:.3f}s, "
+                          f"{run['pairs_per_second']:.0f} pairs/s, peak RSS {run['peak_rss_mb']:.0f} MB", file=sys.stderr)
+                else:
+                    print(f"{backend}/{corpus}/{size}: skipped ({run['skipped']})", file=sys.stderr)
+
+    report = {'environment': environment(), 'runs': runs}
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Deterministic PLO corpora for benchmarks"""
+import random
+from typing import List
+
+# Hand-written outcomes in the style institutions submit
+SAMPLE_PLOS = [
+    "Apply mathematical and computational tools to analyze biological datasets.",
+    "Demonstrate ethical reasoning in professional biological contexts.",
+    "Communicate scientific concepts to both expert and non-expert audiences.",
+    "Design and conduct experiments to test biological hypotheses.",
+    "Work effectively in diverse teams to solve complex biological problems.",
+    "Explain the molecular basis of inheritance and gene expression.",
+    "Evaluate primary literature and identify limitations of published studies.",
+    "Use standard laboratory techniques safely and keep accurate research records.",
+    "Describe how ecological interactions shape populations and communities.",
+    "Develop a plan for continued learning and career development in the life sciences.",
+    "Interpret statistical analyses and present data using appropriate figures.",
+    "Assess the societal and environmental impact of biotechnology.",
+]
+
+# Vocabulary for synthetic outcomes: a Bloom verb, a topic and a context
+VERBS = ['Describe', 'Explain', 'Apply', 'Analyze', 'Evaluate', 'Design', 'Identify', 'Compare',
+         'Demonstrate', 'Interpret', 'Develop', 'Assess', 'Summarize', 'Investigate', 'Create']
+TOPICS = ['cellular respiration', 'population genetics', 'ecosystem dynamics', 'protein structure',
+          'evolutionary relationships', 'experimental design', 'statistical methods', 'scientific writing',
+          'research ethics', 'laboratory safety', 'microbial diversity', 'gene regulation',
+          'conservation strategies', 'physiological systems', 'bioinformatics pipelines', 'field sampling',
+          'peer review', 'science communication', 'data management', 'teamwork and leadership']
+CONTEXTS = ['in laboratory settings', 'for diverse audiences', 'using quantitative reasoning',
+            'across levels of biological organization', 'in collaborative projects', 'in field studies',
+            'with appropriate tools and technologies', 'in the context of societal issues',
+            'to address environmental challenges', 'through written and oral reports']
+
+
+def synthetic_plos(count: int, seed: int = 0) -> List[str]:
+    """Template-generated outcomes (fast to produce, realistic length and vocabulary)"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(VERBS)} {rng.choice(TOPICS)} {rng.choice(CONTEXTS)}." for _ in range(count)]
+
+
+def realistic_plos(count: int, seed: int = 0) -> List[str]:
+    """Hand-written and framework-derived outcomes with light paraphrasing, cycled to the requested size"""
+    from cpf_comparison import CPFComparator
+
+    statements = SAMPLE_PLOS + [plo for _, _, plo in CPFComparator(encoder_backend='lexical').flattened_cpf]
+    rng = random.Random(seed)
+    plos = []
+    while len(plos) < count:
+        words = rng.choice(statements).rstrip('.').split()
+        # Drop or swap a word so resubmission-style near-duplicates are not byte-identical
+        if len(words) > 4 and rng.random() < 0.5:
+            del words[rng.randrange(1, len(words))]
+        if len(words) > 4 and rng.random() < 0.5:
+            i = rng.randrange(1, len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        plos.append(' '.join(words) + '.')
+    return plos
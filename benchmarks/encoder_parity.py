@@ -0,0 +1,129 @@
+"""
+Parity and cost comparison of encoder backends.
+
+Scores a PLO corpus against the CPF with the PyTorch reference and with the ONNX variants, and
+exits with status 1 if any cosine score differs from the reference by more than the backend's
+tolerance. Each backend runs in its own interpreter so load time, throughput and peak RSS are
+measured independently.
+
+Usage:
+    python encoders.py export --quantize           # once, to produce the ONNX graphs
+    python benchmarks/encoder_parity.py [--backends torch onnx onnx-int8] [--plos 500] [--output parity.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Maximum absolute cosine difference from the PyTorch reference
+DEFAULT_TOLERANCES = {'onnx': 1e-3, 'onnx-int8': 0.05}
+
+
+def build_encoder(backend):
+    from encoders import OnnxEncoder, SentenceTransformerEncoder
+
+    if backend == 'torch':
+        return SentenceTransformerEncoder()
+    if backend == 'onnx':
+        return OnnxEncoder(quantized=False)
+    if backend == 'onnx-int8':
+        return OnnxEncoder(quantized=True)
+    raise ValueError(f"Unknown backend {backend}")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_worker(backend, plo_count, scores_path):
+    """Encode the corpus with one backend, save its score matrix and report costs"""
+    import numpy as np
+    from corpus import realistic_plos
+    from cpf_comparison import CPFComparator
+
+    plos = realistic_plos(plo_count, seed=1)
+    cpf_texts = [plo for _, _, plo in CPFComparator(encoder_backend='lexical').flattened_cpf]
+
+    started = time.perf_counter()
+    encoder = build_encoder(backend)
+    load_seconds = time.perf_counter() - started
+
+    encoder.encode(plos[:8])  # warm-up
+    started = time.perf_counter()
+    plo_embeddings = encoder.encode(plos)
+    encode_seconds = time.perf_counter() - started
+    cpf_embeddings = encoder.encode(cpf_texts)
+
+    np.save(scores_path, plo_embeddings @ cpf_embeddings.T)
+    print(json.dumps({
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'texts_per_second': len(plos) / encode_seconds,
+        'peak_rss_mb': peak_rss_mb()
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--plos', type=int, default=500, help='Institutional PLOs to encode')
+    parser.add_argument('--tolerance', type=float, help='Override the per-backend score tolerance')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--scores', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.plos, args.scores)
+        return 0
+
+    import numpy as np
+
+    backends = ['torch'] + [backend for backend in args.backends if backend != 'torch']
+    report = {'plos': args.plos, 'backends': {}}
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scores = {}
+        for backend in backends:
+            path = os.path.join(tmp, f'{backend}.npy')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', backend, '--plos', str(args.plos), '--scores', path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            report['backends'][backend] = json.loads(output.strip().splitlines()[-1])
+            scores[backend] = np.load(path)
+
+        reference = scores['torch']
+        for backend in backends[1:]:
+            difference = np.abs(scores[backend] - reference)
+            tolerance = args.tolerance if args.tolerance is not None else DEFAULT_TOLERANCES.get(backend, 1e-3)
+            passed = bool(difference.max() <= tolerance)
+            failed = failed or not passed
+            report['backends'][backend].update({
+                'max_abs_diff': float(difference.max()),
+                'mean_abs_diff': float(difference.mean()),
+                'best_match_agreement': float(np.mean(scores[backend].argmax(axis=1) == reference.argmax(axis=1))),
+                'tolerance': tolerance,
+                'passed': passed
+            })
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark for the web app.
+
+Each run starts a fresh interpreter and measures:
+  - import_seconds: `import app` (what gunicorn pays before it can serve anything)
+  - first_page_seconds: import plus the first GET / through the test client
+  - warm_up_seconds: building the comparator (model + framework index) via app.warm_up()
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in ('numpy', 'pandas', 'torch', 'sentence_transformers') if name in sys.modules]
+client = app.app.test_client()
+client.get('/')
+first_page = time.perf_counter()
+app.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'first_page_seconds': first_page - started,
+    'warm_up_seconds': warmed - first_page,
+    'heavy_modules_at_import': heavy,
+}))
+"""
+
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", WARMUP_ON_START='0')
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    report = {'runs': runs}
+    for key in ('import_seconds', 'first_page_seconds', 'warm_up_seconds'):
+        values = [run[key] for run in runs]
+        report[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    # Which heavy modules get imported along with app (first run; should be empty)
+    report['heavy_modules_at_import'] = runs[0]['heavy_modules_at_import']
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
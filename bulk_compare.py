@@ -0,0 +1,167 @@
+"""
+Compare many programs' PLOs against the CPF from the command line.
+
+Examples:
+    python bulk_compare.py programs.json > results.ndjson
+    python bulk_compare.py audit.csv --program-column Program --plo-column PLO -o results.ndjson
+    python bulk_compare.py biology.txt chemistry.txt --format compact
+
+Inputs may be a JSON file shaped like the /api/compare/bulk request body, a CSV/XLSX table with
+one row per PLO and a program column, or plain text files (one PLO per line, one program per file).
+Results are written as NDJSON: one {"program": ..., "results": ...} object per line. With
+--export, a flat table with one row per PLO pair and a Program column is streamed instead:
+    python bulk_compare.py audit.csv --program-column Program --export csv -o audit_rows.csv
+    python bulk_compare.py audit.csv --program-column Program --export parquet -o audit.parquet
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import List, Tuple
+
+from cpf_comparison import CPFComparator, DEFAULT_TOP_K, MAX_TOP_K
+from plo_ingest import PLO_COLUMNS, iter_plo_batches, normalize_programs
+
+
+def _read_table_programs(path: str, program_column: str, plo_column: str) -> List[Tuple[str, List[str]]]:
+    """Group the rows of a CSV/XLSX table into programs, preserving first-seen program order"""
+    programs = {}
+
+    if path.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        workbook = None
+        table = io.open(path, encoding='utf-8-sig', newline='')
+        rows = csv.reader(table)
+
+    try:
+        header = [str(name).strip() if name is not None else '' for name in next(rows, [])]
+        if program_column not in header:
+            raise ValueError(f"Column '{program_column}' not found in {path}")
+        if plo_column:
+            if plo_column not in header:
+                raise ValueError(f"Column '{plo_column}' not found in {path}")
+            plo_index = header.index(plo_column)
+        else:
+            plo_index = next((header.index(name) for name in PLO_COLUMNS if name in header), None)
+            if plo_index is None:
+                raise ValueError(f"No PLO column found in {path}; pass --plo-column")
+        program_index = header.index(program_column)
+
+        for row in rows:
+            if max(program_index, plo_index) >= len(row):
+                continue
+            program, plo = row[program_index], row[plo_index]
+            if program is None or plo is None or not str(plo).strip():
+                continue
+            programs.setdefault(str(program).strip(), []).append(str(plo).strip())
+    finally:
+        if workbook is not None:
+            workbook.close()
+        else:
+            table.close()
+
+    return list(programs.items())
+
+
+def load_programs(paths: List[str], program_column: str = None, plo_column: str = None) -> List[Tuple[str, List[str]]]:
+    """Collect (program name, PLOs) pairs from all input files"""
+    programs = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.json':
+            with open(path, encoding='utf-8') as f:
+                programs.extend(normalize_programs(json.load(f)))
+        elif program_column and ext in ('.csv', '.xlsx'):
+            programs.extend(_read_table_programs(path, program_column, plo_column))
+        else:
+            # One program per file, named after the file
+            with open(path, 'rb') as f:
+                plos = [plo for batch in iter_plo_batches(f, ext) for plo in batch]
+            programs.append((os.path.splitext(os.path.basename(path))[0], plos))
+    return programs
+
+
+def _write_export(comparator: CPFComparator, programs: List[Tuple[str, List[str]]], export_format: str,
+                  path: str = None) -> int:
+    """Stream a flat export of every program to a file (or stdout for CSV)"""
+    from result_export import iter_export, scored_programs
+    try:
+        chunks = iter_export(scored_programs(comparator, programs), export_format, with_program=True)
+    except ImportError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    if export_format == 'csv':
+        output = open(path, 'w', encoding='utf-8', newline='') if path else sys.stdout
+    else:
+        output = open(path, 'wb')
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def _top_k(value: str) -> int:
+    """argparse type for --top-k: a positive integer, capped at MAX_TOP_K like the API"""
+    try:
+        top_k = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if top_k < 1:
+        raise argparse.ArgumentTypeError('must be at least 1')
+    return min(top_k, MAX_TOP_K)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compare many programs\' PLOs against the CPF and write NDJSON results.')
+    parser.add_argument('inputs', nargs='+', help='JSON, CSV, XLSX or TXT input files')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    parser.add_argument('--program-column', help='Column naming the program in CSV/XLSX inputs with many programs')
+    parser.add_argument('--plo-column', help='Column holding the PLO text (default: auto-detect)')
+    parser.add_argument('--format', choices=['full', 'compact'], default='full', help='Result format (default: full)')
+    parser.add_argument('--top-k', type=_top_k, default=DEFAULT_TOP_K,
+                        help=f'Matches per PLO in compact results (1-{MAX_TOP_K}, default: {DEFAULT_TOP_K})')
+    parser.add_argument('--export', choices=['csv', 'parquet', 'arrow'],
+                        help='Write every PLO pair as a flat table instead of NDJSON (parquet/arrow need pyarrow and -o)')
+    args = parser.parse_args(argv)
+    if args.export in ('parquet', 'arrow') and not args.output:
+        parser.error(f'--export {args.export} writes binary output; pass -o')
+
+    try:
+        programs = load_programs(args.inputs, args.program_column, args.plo_column)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    comparator = CPFComparator()
+    if args.export:
+        return _write_export(comparator, programs, args.export, args.output)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        scored = comparator.compare_programs(
+            [(name, plos) for name, plos in programs if plos], result_format=args.format, top_k=args.top_k
+        )
+        for name, plos in programs:
+            if not plos:
+                record = {'program': name, 'error': 'No PLOs provided'}
+            else:
+                _, results = next(scored)
+                record = {'program': name, 'results': results}
+            output.write(json.dumps(record) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,126 +1,92 @@
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+import base64
+import hashlib
 import json
-import re
 
-# Try to import sentence_transformers, fallback to simple comparison if not available
-try:
-    from sentence_transformers import SentenceTransformer, util
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-    print("Warning: sentence-transformers not available, using fallback comparison method")
+from alignment_stats import HISTOGRAM_EDGES, GroupStatistics
+from embedding_cache import EmbeddingCache
+from framework_registry import DEFAULT_FRAMEWORK, FrameworkRegistry, get_registry
+from metrics import COMPARISONS, PAIRS_SCORED, PLOS_COMPARED, stage_timer
+from parallel_scoring import get_scorer
+from plo_features import FeatureStore, bloom_levels, bloom_mask, extract_key_terms
+
+# Sentence embedding model and backend selection live in encoders (torch, ONNX or none)
+from encoders import create_encoder
+# Re-exported for callers that checked cpf_comparison.SENTENCE_TRANSFORMERS_AVAILABLE before encoders existed
+from encoders import SENTENCE_TRANSFORMERS_AVAILABLE  # noqa: F401
+
+# Similarity thresholds for full (green) and partial (yellow) alignment
+FULL_ALIGNMENT_THRESHOLD = 0.7
+PARTIAL_ALIGNMENT_THRESHOLD = 0.5
+
+# Matches kept per institutional PLO in compact results
+DEFAULT_TOP_K = 10
+# Largest top_k the API and bulk CLI accept (larger requests are capped)
+MAX_TOP_K = 50
+
+# Part of every result_key; bump it when scoring or the layout of results changes
+RESULTS_VERSION = 1
+
+def encode_array(array: np.ndarray) -> Dict[str, Any]:
+    """Pack a numeric array into a JSON-safe dict (base64 of the raw little-endian buffer)"""
+    array = np.ascontiguousarray(array)
+    dtype = array.dtype.newbyteorder('<')
+    return {
+        'dtype': dtype.name,
+        'shape': list(array.shape),
+        'data': base64.b64encode(array.astype(dtype, copy=False).tobytes()).decode('ascii')
+    }
+
+def decode_array(packed: Dict[str, Any]) -> np.ndarray:
+    """Inverse of encode_array"""
+    dtype = np.dtype(packed['dtype']).newbyteorder('<')
+    return np.frombuffer(base64.b64decode(packed['data']), dtype=dtype).reshape(packed['shape'])
+
+class StaleResultsError(ValueError):
+    """Stored results refer to framework statements by index, and the framework text has since changed"""
 
 class CPFComparator:
-    def __init__(self):
-        # Load a pre-trained semantic similarity model if available
-        if SENTENCE_TRANSFORMERS_AVAILABLE:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        else:
-            self.model = None
-        
-        # Define CPF PLOs grouped by theme with headings (EXACT FRAMEWORK FROM USER'S CSV)
-        self.cpf_plos = {
-            "Knowledge": {
-                "Foundational Knowledge & Concepts": [
-                    "Demonstrate an understanding of five core concepts: evolution, structure and function, information flow, exchange, and storage, pathways and transformations of energy, and systems as they pertain to biological organisms and ecosystems.",
-                    "Demonstrate an understanding of key concepts, theories, and interdisciplinary connections in biology, including genetics, cell and molecular biology, physiology, ecology, and evolutionary biology.",
-                    "Understand how structure and function are correlated at all levels of biological organization.",
-                    "Understand how interactions between organisms and their environment drive the dynamics of individuals, populations, communities, and ecosystems.",
-                    "Distinguish between elements of experimental design, including research questions/objectives, hypotheses, methodology, data and results, and conclusions.",
-                    "Describe the peer review process for academic publication.",
-                    "Differentiate between the formats in which scientists disseminate knowledge.",
-                    "Identify the appropriate tools and methods associated with sub-disciplines in biology, ranging from microbiology to the study of the biosphere.",
-                    "Demonstrate an understanding of how history has shaped biology and biological research, and communication of the sciences."
-                ],
-                "Knowledge Expansion": [
-                    "Understand contemporary biological issues regarding environment, health, economy, and society.",
-                    "Demonstrate knowledge of ethical, economic, commercial, and social implications of scientific research and technological innovation.",
-                    "Describe the role and responsibilities of biologists in society.",
-                    "Recognize the limitations of technology and how it can impact our ability to explore reality and modify biological theories.",
-                    "Identify biological assumptions in society and the resulting challenges due to the inherent complexity of biological systems.",
-                    "Understand the consequences of organism interactions in natural populations, communities, and ecosystems.",
-                    "Understand how technological innovation impacts the process and communication of scientific information, and how it affects the role of scientists in the community."
-                ],
-                "Integration of Knowledge": [
-                    "Integrate knowledge of biological systems at all levels, from genes to ecosystems, using cellular, physiological, ecological, and evolutionary principles and history.",
-                    "Explain how biology builds upon other academic disciplines and facilitates understanding of other sciences and humanities.",
-                    "Understand the interconnectedness and interdependencies of biological processes (systems biology) at the cellular, organism, and ecosystem levels."
-                ]
-            },
-            "Skills": {
-                "Communication": [
-                    "Effectively communicate complex biological concepts to diverse audiences using oral, visual, and written formats.",
-                    "Appraise audiences and tailor information dissemination accordingly.",
-                    "Discuss and reflect on biological findings and their impact on society.",
-                    "Critically appraise scientific literature and communicate the limitations of data when formulating conclusions.",
-                    "Correctly cite and reference sources in written work.",
-                    "Illustrate how biology relates to current events, global issues, and other scientific disciplines."
-                ],
-                "Application and Critical Thinking": [
-                    "Utilize interdisciplinary approaches to identify and address biological problems within societal and environmental contexts.",
-                    "Apply foundational knowledge and concepts to analyze biological solutions and develop innovative solutions at various levels of organization.",
-                    "Evaluate gaps in biological knowledge and engage in critical analysis of pertinent topics within the field.",
-                    "Synthesize and interpret biological information using appropriate methods such as graphs, figures, diagrams, or statistical analyses.",
-                    "Recognize the limits of current biological knowledge and evaluate new and emerging concepts in the field.",
-                    "Utilize innovative technology to explore and expand knowledge of biology.",
-                    "Evaluate information from diverse media sources to form informed opinions on politicized biological issues.",
-                    "Critically analyze the social and political factors that shape scientific research and its applications."
-                ],
-                "Research and Laboratory Techniques": [
-                    "Demonstrate proficiency in applying the scientific method to develop and test hypotheses, as well as in collecting, analyzing, and interpreting data.",
-                    "Gain hands-on experience in laboratory and/or field settings, exploring areas relevant to biological sciences.",
-                    "Utilize standard laboratory and field sampling techniques, tools, calculations, and statistical methods.",
-                    "Maintain proper research records and apply effective data management techniques."
-                ],
-                "Teamwork": [
-                    "Collaborate effectively in a team setting, demonstrating both leadership and participation skills.",
-                    "Apply efficient time management and collaboration strategies to produce high-quality projects.",
-                    "Participate constructively in group activities and peer reviews.",
-                    "Respectfully collaborate with interdisciplinary teams of colleagues and community members to share biological knowledge.",
-                    "Consider diverse perspectives and respect contributions of others."
-                ]
-            },
-            "Values": {
-                "Professional and Ethical Behaviour": [
-                    "Act with scientific, academic, and professional integrity and ethics.",
-                    "Differentiate between ethical and unethical animal practices when designing biological experiments, and judge which procedures are appropriate according to government protocols.",
-                    "Adhere to professional standards regarding data use and ownership, privacy, intellectual property, and artificial intelligence use.",
-                    "Contribute to building a safe, supportive, and professional learning environment."
-                ],
-                "Societal Importance": [
-                    "Analyze and critically evaluate the societal importance of biological sciences, including the relevance to human welfare, conservation, and sustainability.",
-                    "Develop personal beliefs and values regarding biological issues in society, and initiate action in support of these values.",
-                    "Recognize and understand sustainability challenges from a scientific perspective and the need for multiple perspectives, such as those found within indigenous systems, to achieve a sustainable future."
-                ],
-                "Commitment to Lifelong Learning": [
-                    "Demonstrate self-direction and motivation towards learning.",
-                    "Identify personal interests and develop a plan for a career in biology.",
-                    "Develop a comprehensive understanding of oneself as a learner and apply appropriate learning strategies to various situations."
-                ]
-            }
-        }
+    def __init__(self, encoder=None, encoder_backend: str = None, framework: str = DEFAULT_FRAMEWORK,
+                 registry: FrameworkRegistry = None, embedding_cache: EmbeddingCache = None):
+        # Load a pre-trained semantic similarity model if available (see encoders.create_encoder)
+        self.encoder = encoder if encoder is not None else create_encoder(encoder_backend)
+        # Identifies the embedding space (or lexical scoring) that produced a result's scores
+        self.encoder_name = self.encoder.name if self.encoder else 'lexical'
         
-        # Flatten CPF PLOs for comparison with headings
-        self.flattened_cpf = []
-        for theme, headings in self.cpf_plos.items():
-            for heading, plos in headings.items():
-                for plo in plos:
-                    self.flattened_cpf.append((theme, heading, plo))
-    
-    def _extract_key_terms(self, text: str) -> List[str]:
-        """Extract key terms from text for similarity analysis"""
-        # Remove common words and extract meaningful terms
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
+        # Frameworks are data files (frameworks/cpf.json by default); see framework_registry
+        self.registry = registry or get_registry()
+        self.framework = self.registry.get(framework)
+        
+        # Framework PLOs grouped by theme with headings, and flattened for comparison
+        self.cpf_plos = self.framework.themes
+        self.flattened_cpf = self.framework.flattened
         
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
+        # Identifies the framework text in stored results that refer to CPF statements by index
+        self.framework_version = self.framework.version
         
-        # Filter out common words and short words
-        key_terms = [word for word in words if word not in common_words and len(word) > 2]
+        # Key terms, Bloom bitmasks and the lexical index are built once per framework and shared
+        self.cpf_features = self.framework.features
+        self.lexical_index = self.framework.lexical_index
         
-        return key_terms
+        # Framework statements never change, so their embeddings come from a persisted, memory-mapped index
+        self.cpf_embeddings = None
+        self.embedding_cache = None
+        if self.encoder:
+            # Resubmitted institutional PLOs are looked up instead of re-encoded
+            self.embedding_cache = embedding_cache or EmbeddingCache(self.encoder.name)
+            self.cpf_embeddings = self.framework.embeddings(self.encoder)
+        
+        # Column groupings for the theme and heading statistics
+        self.theme_groups = GroupStatistics([theme for theme, _, _ in self.flattened_cpf])
+        self.heading_groups = GroupStatistics([(theme, heading) for theme, heading, _ in self.flattened_cpf])
+        
+        # Comparators for other frameworks sharing this encoder and cache (see for_framework)
+        self._framework_comparators = {self.framework.key: self}
+    
+    def _extract_key_terms(self, text: str) -> List[str]:
+        """Extract key terms from text for similarity analysis"""
+        return extract_key_terms(text)
     
     def _find_common_terms(self, text1: str, text2: str) -> List[str]:
         """Find common terms between two texts"""
@@ -130,22 +96,7 @@ class CPFComparator:
     
     def _analyze_bloom_taxonomy(self, text: str) -> Dict[str, bool]:
         """Analyze text for Bloom's Taxonomy levels"""
-        bloom_verbs = {
-            'remember': ['define', 'describe', 'identify', 'list', 'name', 'recall', 'recognize', 'state'],
-            'understand': ['explain', 'summarize', 'interpret', 'classify', 'compare', 'contrast', 'describe'],
-            'apply': ['apply', 'demonstrate', 'execute', 'implement', 'solve', 'use', 'utilize'],
-            'analyze': ['analyze', 'examine', 'investigate', 'compare', 'differentiate', 'distinguish'],
-            'evaluate': ['evaluate', 'assess', 'critique', 'judge', 'appraise', 'examine'],
-            'create': ['create', 'design', 'develop', 'formulate', 'generate', 'produce', 'construct']
-        }
-        
-        text_lower = text.lower()
-        levels = {}
-        
-        for level, verbs in bloom_verbs.items():
-            levels[level] = any(verb in text_lower for verb in verbs)
-        
-        return levels
+        return bloom_levels(bloom_mask(text))
     
     def _calculate_simple_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity using simple term overlap when sentence-transformers is not available"""
@@ -169,155 +120,244 @@ class CPFComparator:
         
         return min(similarity, 1.0)  # Cap at 1.0
 
-    def compare_plos(self, institutional_plos: List[str]) -> Dict[str, Any]:
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in batched forward passes into unit-length float32 embeddings"""
+        return self.encoder.encode(texts)
+    
+    def _similarity_matrix(self, institutional_plos: List[str], inst_features: FeatureStore = None,
+                           inst_embeddings: np.ndarray = None) -> np.ndarray:
+        """
+        Score every institutional PLO against every CPF PLO (rows: institutional, columns: flattened CPF).
+        inst_embeddings lets callers scoring one PLO set against several frameworks encode it only once.
+        """
+        cpf_texts = [cpf_plo for _, _, cpf_plo in self.flattened_cpf]
+        
+        if not institutional_plos:
+            return np.zeros((0, len(cpf_texts)), dtype=np.float32)
+        
+        PLOS_COMPARED.inc(len(institutional_plos))
+        PAIRS_SCORED.inc(len(institutional_plos) * len(cpf_texts))
+        
+        if self.encoder:
+            if inst_embeddings is None:
+                with stage_timer('encode'):
+                    inst_embeddings = self.embedding_cache.encode(institutional_plos, self._encode)
+            # Embeddings are normalized, so a single matrix multiply yields every cosine similarity
+            with stage_timer('similarity'):
+                return inst_embeddings @ self.cpf_embeddings.T
+        
+        # Lexical fallback: whole-matrix term overlap via sparse products
+        if inst_features is None:
+            inst_features = FeatureStore(institutional_plos)
+        with stage_timer('similarity'):
+            return self.lexical_index.similarity_from_terms(inst_features.terms)
+
+    def _classify_alignment(self, similarity: float):
+        """Map a similarity score to (alignment score, alignment type, crosswalk colour)"""
+        if similarity >= FULL_ALIGNMENT_THRESHOLD:
+            return 1.0, "Full", 'green'  # Full alignment
+        elif similarity >= PARTIAL_ALIGNMENT_THRESHOLD:
+            return 0.5, "Partial", 'yellow'  # Partial alignment
+        return 0.0, "None", 'red'  # No alignment
+
+    def compare_plos(self, institutional_plos: List[str], result_format: str = 'full',
+                     top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
         """
         Compare institutional PLOs with CPF framework using the user's specific criteria:
         - Content alignment (0.5 if content matches)
         - Depth of learning alignment (1.0 if both content and depth match)
         - Threshold for "match" is 0.7
+        
+        result_format='compact' returns the storage-oriented form built by _build_compact_results;
+        expand_results turns it back into the full form used by the templates.
+        """
+        if result_format not in ('full', 'compact'):
+            raise ValueError("Unsupported result format. Use 'full' or 'compact'")
+        
+        # Large submissions are sharded across a process pool when SCORING_WORKERS > 1
+        scorer = get_scorer()
+        if scorer and len(institutional_plos) > scorer.chunk_size:
+            return scorer.compare_plo_batches(self, [institutional_plos], result_format, top_k)
+        
+        # Key terms and Bloom levels of the submission are extracted once per request
+        with stage_timer('features'):
+            inst_features = FeatureStore(institutional_plos)
+        
+        # Score the whole institutional x CPF grid once; every view below is derived from it
+        similarity_matrix = self._similarity_matrix(institutional_plos, inst_features)
+        
+        return self._format_results(institutional_plos, similarity_matrix, inst_features, result_format, top_k)
+
+    def result_key(self, institutional_plos: List[str], result_format: str = 'full',
+                   top_k: int = DEFAULT_TOP_K) -> str:
         """
-        results = {
-            'summary': {},
-            'detailed_results': [],
-            'theme_breakdown': {},
-            'recommendations': [],
-            'crosswalk_matrix': {}
+        Hash identifying the results compare_plos returns for these arguments: the PLO list (in a
+        canonical JSON encoding), framework and its version, encoder model/backend and thresholds
+        """
+        identity = {
+            'results_version': RESULTS_VERSION,
+            'framework': self.framework.key,
+            'framework_version': self.framework_version,
+            'encoder': self.encoder_name,
+            'thresholds': [FULL_ALIGNMENT_THRESHOLD, PARTIAL_ALIGNMENT_THRESHOLD],
+            'format': result_format,
+            'top_k': top_k if result_format == 'compact' else None,
+            'plos': institutional_plos
         }
+        encoded = json.dumps(identity, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def compare_plo_batches(self, plo_batches: Iterable[List[str]], result_format: str = 'full',
+                            top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+        """
+        Same as compare_plos for PLOs that arrive in batches (e.g. streamed from an upload).
+        Each batch is featurized and scored as soon as it arrives, so encoder memory is bounded
+        by the batch size rather than the size of the file.
+        """
+        if result_format not in ('full', 'compact'):
+            raise ValueError("Unsupported result format. Use 'full' or 'compact'")
         
-        # Compare each institutional PLO with all CPF PLOs
-        detailed_results = []
-        theme_scores = {'Knowledge': [], 'Skills': [], 'Values': []}
+        # With a process pool, shards are scored while later batches are still being read
+        scorer = get_scorer()
+        if scorer:
+            return scorer.compare_plo_batches(self, plo_batches, result_format, top_k)
+        
+        institutional_plos = []
+        score_rows = []
+        feature_batches = []
+        for batch in plo_batches:
+            if not batch:
+                continue
+            features = FeatureStore(batch)
+            score_rows.append(self._similarity_matrix(batch, features))
+            feature_batches.append(features)
+            institutional_plos.extend(batch)
+        
+        if score_rows:
+            similarity_matrix = np.vstack(score_rows)
+        else:
+            similarity_matrix = self._similarity_matrix([])
+        inst_features = FeatureStore.concatenate(feature_batches)
+        
+        return self._format_results(institutional_plos, similarity_matrix, inst_features, result_format, top_k)
+
+    def compare_programs(self, programs: Iterable[Tuple[str, List[str]]], result_format: str = 'full',
+                         top_k: int = DEFAULT_TOP_K) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Compare many named programs at once. All PLOs are featurized and scored as one stacked
+        matrix against the framework; per-program results are then built (and yielded) one at a
+        time from their slice of that matrix.
+        """
+        if result_format not in ('full', 'compact'):
+            raise ValueError("Unsupported result format. Use 'full' or 'compact'")
+        
+        for name, plos, similarity_matrix, inst_features in self.score_programs(programs):
+            yield name, self._format_results(plos, similarity_matrix, inst_features, result_format, top_k)
+
+    def score_programs(self, programs: Iterable[Tuple[str, List[str]]]) -> Iterator[Tuple[str, List[str], np.ndarray, FeatureStore]]:
+        """
+        Score many named programs as one stacked matrix and yield each program's
+        (name, PLOs, score rows, features). The score rows are views of the stacked matrix,
+        so exports can stream straight from them without building per-program results.
+        """
+        programs = list(programs)
+        stacked_plos = [plo for _, plos in programs for plo in plos]
+        scorer = get_scorer()
+        if scorer and len(stacked_plos) > scorer.chunk_size:
+            similarity_matrix, inst_features = scorer.score(self, stacked_plos)
+        else:
+            inst_features = FeatureStore(stacked_plos)
+            similarity_matrix = self._similarity_matrix(stacked_plos, inst_features)
+        
+        start = 0
+        for name, plos in programs:
+            stop = start + len(plos)
+            yield name, list(plos), similarity_matrix[start:stop], inst_features.subset(start, stop)
+            start = stop
+
+    def _format_results(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                        inst_features: FeatureStore, result_format: str, top_k: int) -> Dict[str, Any]:
+        """Build results in the requested format from a scored matrix"""
+        COMPARISONS.inc(format=result_format)
+        if result_format == 'compact':
+            return self._build_compact_results(institutional_plos, similarity_matrix, inst_features, top_k)
+        return self._build_results(institutional_plos, similarity_matrix, inst_features)
+
+    def _match_entry(self, j: int, similarity: float, common_terms: List[str], bloom_alignment: bool,
+                     inst_bloom: Dict[str, bool]) -> Dict[str, Any]:
+        """Detailed-results entry for one institutional PLO against CPF statement j"""
+        theme, heading, cpf_plo = self.flattened_cpf[j]
         
-        # Create crosswalk matrix structure
+        # Apply user's scoring criteria
+        score, alignment_type, _ = self._classify_alignment(similarity)
+        
+        return {
+            'cpf_theme': theme,
+            'cpf_heading': heading,
+            'cpf_plo': cpf_plo,
+            'similarity_score': round(similarity, 3),
+            'alignment_score': score,
+            'common_terms': common_terms,
+            'bloom_alignment': bloom_alignment,
+            'inst_bloom': inst_bloom,
+            'cpf_bloom': self.cpf_features.bloom_dicts[j],
+            'alignment_type': alignment_type
+        }
+
+    def _crosswalk_matrix(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                          bloom_alignment_matrix: np.ndarray) -> Dict[str, Any]:
+        """CPF x institutional crosswalk; cells carry the same scores as detailed_results"""
         crosswalk_matrix = {
-            'cpf_plos': [],
+            'cpf_plos': [
+                {'theme': theme, 'heading': heading, 'plo': plo}
+                for theme, heading, plo in self.flattened_cpf
+            ],
             'institutional_plos': institutional_plos,
             'matrix': {}
         }
         
-        # Initialize matrix with CPF PLOs
-        for theme, headings in self.cpf_plos.items():
-            for heading, plos in headings.items():
-                for plo in plos:
-                    crosswalk_matrix['cpf_plos'].append({
-                        'theme': theme,
-                        'heading': heading,
-                        'plo': plo
-                    })
-        
-        for inst_plo in institutional_plos:
-            plo_matches = []
-            
-            for theme, heading, cpf_plo in self.flattened_cpf:
-                # Calculate similarity using available method
-                if SENTENCE_TRANSFORMERS_AVAILABLE and self.model:
-                    inst_emb = self.model.encode(inst_plo, convert_to_tensor=True)
-                    cpf_emb = self.model.encode(cpf_plo, convert_to_tensor=True)
-                    similarity = util.cos_sim(inst_emb, cpf_emb).item()
-                else:
-                    similarity = self._calculate_simple_similarity(inst_plo, cpf_plo)
-                
-                # Find common terms for explanation
-                common_terms = self._find_common_terms(inst_plo, cpf_plo)
-                
-                # Analyze Bloom's Taxonomy levels
-                inst_bloom = self._analyze_bloom_taxonomy(inst_plo)
-                cpf_bloom = self._analyze_bloom_taxonomy(cpf_plo)
-                
-                # Check for Bloom's Taxonomy alignment
-                bloom_alignment = any(inst_bloom[level] and cpf_bloom[level] for level in inst_bloom.keys())
-                
-                # Apply user's scoring criteria
-                if similarity >= 0.7:
-                    score = 1.0  # Full alignment (green)
-                    alignment_type = "Full"
-                elif similarity >= 0.5:
-                    score = 0.5  # Partial alignment (yellow)
-                    alignment_type = "Partial"
-                else:
-                    score = 0.0  # No alignment (red)
-                    alignment_type = "None"
-                
-                plo_matches.append({
-                    'cpf_theme': theme,
-                    'cpf_heading': heading,
-                    'cpf_plo': cpf_plo,
-                    'similarity_score': round(similarity, 3),
-                    'alignment_score': score,
-                    'common_terms': common_terms,
-                    'bloom_alignment': bloom_alignment,
-                    'inst_bloom': inst_bloom,
-                    'cpf_bloom': cpf_bloom,
-                    'alignment_type': alignment_type
-                })
-                
-                theme_scores[theme].append(similarity)
-            
-            # Sort matches by similarity score
-            plo_matches.sort(key=lambda x: x['similarity_score'], reverse=True)
-            
-            detailed_results.append({
-                'institutional_plo': inst_plo,
-                'matches': plo_matches,
-                'best_match': plo_matches[0] if plo_matches else None
-            })
-        
-        # Build crosswalk matrix (simplified for deployment)
-        for i, cpf_item in enumerate(crosswalk_matrix['cpf_plos']):
-            cpf_plo = cpf_item['plo']
-            
-            for j, inst_plo in enumerate(institutional_plos):
-                # Use simple similarity calculation for deployment
-                similarity = self._calculate_simple_similarity(inst_plo, cpf_plo)
-                
-                # Find common terms
-                common_terms = self._find_common_terms(inst_plo, cpf_plo)
-                
-                # Analyze Bloom's Taxonomy
-                inst_bloom = self._analyze_bloom_taxonomy(inst_plo)
-                cpf_bloom = self._analyze_bloom_taxonomy(cpf_plo)
-                bloom_alignment = any(inst_bloom[level] and cpf_bloom[level] for level in inst_bloom.keys())
+        for i in range(len(institutional_plos)):
+            for j in range(len(self.flattened_cpf)):
+                similarity = float(similarity_matrix[i, j])
+                score, alignment_type, color = self._classify_alignment(similarity)
                 
-                # Apply scoring criteria
-                if similarity >= 0.7:
-                    score = 1.0
-                    color = 'green'
-                    alignment_type = "Full"
-                elif similarity >= 0.5:
-                    score = 0.5
-                    color = 'yellow'
-                    alignment_type = "Partial"
-                else:
-                    score = 0.0
-                    color = 'red'
-                    alignment_type = "None"
-                
-                matrix_key = f"{i}_{j}"
-                crosswalk_matrix['matrix'][matrix_key] = {
+                # Term and Bloom details live in detailed_results
+                crosswalk_matrix['matrix'][f"{j}_{i}"] = {
                     'score': round(similarity, 3),
                     'alignment_score': score,
                     'color': color,
-                    'common_terms': common_terms,
-                    'bloom_alignment': bloom_alignment,
-                    'alignment_type': alignment_type,
-                    'inst_bloom': inst_bloom,
-                    'cpf_bloom': cpf_bloom
+                    'bloom_alignment': bool(bloom_alignment_matrix[i, j]),
+                    'alignment_type': alignment_type
                 }
         
-        results['crosswalk_matrix'] = crosswalk_matrix
+        return crosswalk_matrix
+
+    def _breakdowns(self, similarity_matrix: np.ndarray) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Per-theme and per-heading statistics (see alignment_stats), computed from the whole matrix"""
+        theme_breakdown = self.theme_groups.compute(
+            similarity_matrix, FULL_ALIGNMENT_THRESHOLD, PARTIAL_ALIGNMENT_THRESHOLD
+        )
+        heading_breakdown = {theme: {} for theme in self.cpf_plos}
+        heading_stats = self.heading_groups.compute(
+            similarity_matrix, FULL_ALIGNMENT_THRESHOLD, PARTIAL_ALIGNMENT_THRESHOLD
+        )
+        for (theme, heading), stats in heading_stats.items():
+            heading_breakdown[theme][heading] = stats
+        return theme_breakdown, heading_breakdown
+
+    def _summarize(self, similarity_matrix: np.ndarray) -> Dict[str, Any]:
+        """Summary statistics, theme/heading breakdowns and recommendations for a similarity matrix"""
+        theme_breakdown, heading_breakdown = self._breakdowns(similarity_matrix)
         
         # Calculate summary statistics
-        total_plos = len(institutional_plos)
-        avg_scores = {}
-        for theme in theme_scores:
-            if theme_scores[theme]:
-                avg_scores[theme] = round(np.mean(theme_scores[theme]), 3)
-            else:
-                avg_scores[theme] = 0.0
+        total_plos = len(similarity_matrix)
+        avg_scores = {theme: stats['mean'] for theme, stats in theme_breakdown.items()}
         
-        # Calculate overall alignment score
-        all_scores = [score for scores in theme_scores.values() for score in scores]
-        overall_alignment = float(round(np.mean(all_scores), 3)) if all_scores else 0.0
+        # Calculate overall alignment score (the mean over every pair)
+        total_pairs = similarity_matrix.size
+        overall_alignment = (
+            float(round(float(np.sum(similarity_matrix, dtype=np.float64)) / total_pairs, 3)) if total_pairs else 0.0
+        )
         
         # Generate recommendations
         recommendations = self._generate_recommendations(avg_scores, overall_alignment)
@@ -329,43 +369,329 @@ class CPFComparator:
             strongest_theme = max(avg_scores.keys(), key=lambda k: avg_scores[k])
             weakest_theme = min(avg_scores.keys(), key=lambda k: avg_scores[k])
         
-        results['summary'] = {
-            'total_plos_analyzed': total_plos,
-            'overall_alignment_score': overall_alignment,
-            'theme_averages': avg_scores,
-            'strongest_theme': strongest_theme,
-            'weakest_theme': weakest_theme
+        return {
+            'summary': {
+                'total_plos_analyzed': total_plos,
+                'overall_alignment_score': overall_alignment,
+                'theme_averages': avg_scores,
+                'strongest_theme': strongest_theme,
+                'weakest_theme': weakest_theme
+            },
+            'recommendations': recommendations,
+            'theme_breakdown': theme_breakdown,
+            'heading_breakdown': heading_breakdown,
+            'histogram_edges': HISTOGRAM_EDGES.tolist()
         }
+
+    def _build_results(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                       inst_features: FeatureStore = None) -> Dict[str, Any]:
+        """Build detailed results, crosswalk matrix and summary from a precomputed similarity matrix"""
+        if inst_features is None:
+            inst_features = FeatureStore(institutional_plos)
+        
+        # Bloom's Taxonomy alignment for every pair: a bitwise AND of the level masks
+        bloom_alignment_matrix = inst_features.bloom_alignment(self.cpf_features)
         
-        results['detailed_results'] = detailed_results
-        results['theme_breakdown'] = theme_scores
-        results['recommendations'] = recommendations
+        with stage_timer('summary'):
+            results = self._summarize(similarity_matrix)
+        with stage_timer('detailed_results'):
+            results['detailed_results'] = self._detailed_results(
+                institutional_plos, similarity_matrix, inst_features, bloom_alignment_matrix
+            )
+        with stage_timer('crosswalk'):
+            results['crosswalk_matrix'] = self._crosswalk_matrix(institutional_plos, similarity_matrix, bloom_alignment_matrix)
+        
+        return results
+
+    def _detailed_results(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                          inst_features: FeatureStore, bloom_alignment_matrix: np.ndarray) -> List[Dict[str, Any]]:
+        """Every CPF match of every institutional PLO, best first"""
+        cpf_terms = self.cpf_features.terms
+        detailed_results = []
+        for i, inst_plo in enumerate(institutional_plos):
+            inst_terms = inst_features.terms[i]
+            inst_bloom = inst_features.bloom_dicts[i]
+            
+            plo_matches = [
+                self._match_entry(j, float(similarity_matrix[i, j]), sorted(inst_terms & cpf_terms[j]),
+                                  bool(bloom_alignment_matrix[i, j]), inst_bloom)
+                for j in range(len(self.flattened_cpf))
+            ]
+            
+            # Sort matches by similarity score
+            plo_matches.sort(key=lambda x: x['similarity_score'], reverse=True)
+            
+            detailed_results.append({
+                'institutional_plo': inst_plo,
+                'matches': plo_matches,
+                'best_match': plo_matches[0] if plo_matches else None
+            })
         
+        return detailed_results
+
+    def _build_compact_results(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                               inst_features: FeatureStore, top_k: int) -> Dict[str, Any]:
+        """
+        Storage-oriented results: the dense score array, the top-K matches per PLO referring to
+        CPF statements by index, and Bloom levels as bitmasks. Everything else in the full form
+        (alignment types, crosswalk cells, Bloom dicts) is derived from these on expansion.
+        """
+        with stage_timer('top_matches'):
+            top_matches = self._top_matches(similarity_matrix, inst_features, top_k)
+        return self._compact_results(institutional_plos, similarity_matrix, top_matches, inst_features.bloom_masks)
+
+    def _top_matches(self, similarity_matrix: np.ndarray, inst_features: FeatureStore,
+                     top_k: int) -> List[List[Dict[str, Any]]]:
+        """Top-K matches per row of a score matrix, referring to CPF statements by index"""
+        top_matches = []
+        for i in range(len(similarity_matrix)):
+            rounded = np.array([round(float(score), 3) for score in similarity_matrix[i]])
+            # Stable descending order, identical to sorting the full match list
+            order = np.argsort(-rounded, kind='stable')[:top_k]
+            top_matches.append([
+                {
+                    'cpf_index': int(j),
+                    'similarity_score': float(rounded[j]),
+                    'common_terms': sorted(inst_features.terms[i] & self.cpf_features.terms[j])
+                }
+                for j in order
+            ])
+        return top_matches
+
+    def _compact_results(self, institutional_plos: List[str], similarity_matrix: np.ndarray,
+                         top_matches: List[List[Dict[str, Any]]], inst_bloom_masks: np.ndarray) -> Dict[str, Any]:
+        """Assemble compact results; the summary is always recomputed from the whole matrix"""
+        with stage_timer('summary'):
+            results = self._summarize(similarity_matrix)
+        results.update({
+            'format': 'compact',
+            'framework_key': self.framework.key,
+            'framework_version': self.framework_version,
+            'encoder': self.encoder_name,
+            'institutional_plos': institutional_plos,
+            'scores': encode_array(similarity_matrix),
+            'top_matches': top_matches,
+            'inst_bloom_masks': np.asarray(inst_bloom_masks, dtype=np.uint8).tolist(),
+            'cpf_bloom_masks': self.cpf_features.bloom_masks.tolist()
+        })
         return results
+
+    def recompare_plos(self, institutional_plos: List[str], previous_results: Dict[str, Any],
+                       result_format: str = 'compact', top_k: int = DEFAULT_TOP_K) -> Tuple[Dict[str, Any], int]:
+        """
+        Re-compare an edited PLO list, scoring only the lines that are new or changed.
+        
+        Rows of previous compact results are reused for PLOs whose text is unchanged (wherever they
+        moved in the list); the summary, theme averages and recommendations are recomputed from the
+        merged score matrix, so the output matches a fresh compare_plos. Previous results that cannot
+        be reused (full format, another framework version or encoder, fewer stored matches than
+        top_k) fall back to a full comparison. Returns (results, number of PLOs reused).
+        """
+        if result_format not in ('full', 'compact'):
+            raise ValueError("Unsupported result format. Use 'full' or 'compact'")
+        
+        n_cpf = len(self.flattened_cpf)
+        reusable = (
+            previous_results is not None
+            and previous_results.get('format') == 'compact'
+            and previous_results.get('framework_key', DEFAULT_FRAMEWORK) == self.framework.key
+            and previous_results.get('framework_version') == self.framework_version
+            # Scores from another embedding space (or lexical scoring) are on a different scale
+            and previous_results.get('encoder') == self.encoder_name
+            and all(len(matches) >= min(top_k, n_cpf) for matches in previous_results['top_matches'])
+        )
+        if not reusable:
+            return self.compare_plos(institutional_plos, result_format, top_k), 0
+        COMPARISONS.inc(format='incremental')
+        
+        # Unchanged PLOs keep their previous row (first occurrence wins for repeated lines)
+        previous_rows = {}
+        for i, plo in enumerate(previous_results['institutional_plos']):
+            previous_rows.setdefault(plo, i)
+        source_rows = [previous_rows.get(plo) for plo in institutional_plos]
+        changed = [i for i, row in enumerate(source_rows) if row is None]
+        
+        # Score only the new or edited lines
+        changed_plos = [institutional_plos[i] for i in changed]
+        changed_features = FeatureStore(changed_plos)
+        changed_scores = self._similarity_matrix(changed_plos, changed_features)
+        
+        previous_scores = decode_array(previous_results['scores'])
+        similarity_matrix = np.empty(
+            (len(institutional_plos), n_cpf), dtype=np.result_type(previous_scores, changed_scores)
+        )
+        reused = [i for i, row in enumerate(source_rows) if row is not None]
+        similarity_matrix[reused] = previous_scores[[source_rows[i] for i in reused]]
+        similarity_matrix[changed] = changed_scores
+        
+        if result_format == 'full':
+            return self._build_results(institutional_plos, similarity_matrix), len(reused)
+        
+        changed_top = iter(self._top_matches(changed_scores, changed_features, top_k))
+        changed_masks = iter(changed_features.bloom_masks)
+        top_matches, bloom_masks = [], []
+        for row in source_rows:
+            if row is None:
+                top_matches.append(next(changed_top))
+                bloom_masks.append(next(changed_masks))
+            else:
+                top_matches.append(previous_results['top_matches'][row][:top_k])
+                bloom_masks.append(previous_results['inst_bloom_masks'][row])
+        
+        return self._compact_results(institutional_plos, similarity_matrix, top_matches, bloom_masks), len(reused)
+
+    def expand_results(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild the full result shape from compact results (full results are returned unchanged)"""
+        if results.get('format') != 'compact':
+            return results
+        comparator = self._comparator_for(results)
+        with stage_timer('expand'):
+            return comparator._expand_compact(results)
+
+    def _comparator_for(self, results: Dict[str, Any]) -> 'CPFComparator':
+        """The comparator for a compact result's framework, checking the framework text is unchanged"""
+        # Results stored before the framework registry existed are CPF results
+        comparator = self.for_framework(results.get('framework_key', DEFAULT_FRAMEWORK))
+        if results.get('framework_version') != comparator.framework_version:
+            raise StaleResultsError(f"Stored results were produced against an older version of the {comparator.framework.short_name} framework; re-run the comparison")
+        return comparator
+
+    def _detailed_entries(self, results: Dict[str, Any], scores: np.ndarray, start: int, stop: int,
+                          max_matches: int = None) -> List[Dict[str, Any]]:
+        """detailed_results entries for institutional PLOs start..stop of compact results"""
+        inst_masks = np.array(results['inst_bloom_masks'][start:stop], dtype=np.uint8)
+        bloom_alignment_matrix = (inst_masks[:, None] & self.cpf_features.bloom_masks[None, :]) != 0
+        
+        detailed_results = []
+        for offset, inst_plo in enumerate(results['institutional_plos'][start:stop]):
+            i = start + offset
+            inst_bloom = bloom_levels(int(inst_masks[offset]))
+            plo_matches = [
+                self._match_entry(match['cpf_index'], float(scores[i, match['cpf_index']]), match['common_terms'],
+                                  bool(bloom_alignment_matrix[offset, match['cpf_index']]), inst_bloom)
+                for match in results['top_matches'][i][:max_matches]
+            ]
+            detailed_results.append({
+                'institutional_plo': inst_plo,
+                'matches': plo_matches,
+                'best_match': plo_matches[0] if plo_matches else None
+            })
+        return detailed_results
+
+    def _breakdown_fields(self, results: Dict[str, Any], scores: np.ndarray) -> Dict[str, Any]:
+        """theme/heading breakdowns of compact results (recomputed for results stored before they existed)"""
+        source = results if 'heading_breakdown' in results else self._summarize(scores)
+        return {key: source[key] for key in ('theme_breakdown', 'heading_breakdown', 'histogram_edges')}
+
+    def _expand_compact(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Detailed results and crosswalk rebuilt from a compact result's scores and top matches"""
+        institutional_plos = results['institutional_plos']
+        scores = decode_array(results['scores'])
+        inst_masks = np.array(results['inst_bloom_masks'], dtype=np.uint8)
+        bloom_alignment_matrix = (inst_masks[:, None] & self.cpf_features.bloom_masks[None, :]) != 0
+        
+        return {
+            'summary': results['summary'],
+            'recommendations': results['recommendations'],
+            'detailed_results': self._detailed_entries(results, scores, 0, len(institutional_plos)),
+            **self._breakdown_fields(results, scores),
+            'crosswalk_matrix': self._crosswalk_matrix(institutional_plos, scores, bloom_alignment_matrix)
+        }
+
+    def summary_view(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The page-level part of compact results for lazy rendering: summary, breakdowns, recommendations
+        and the best-match distribution. The crosswalk and per-PLO details are served separately by
+        crosswalk_tile and detail_page.
+        """
+        comparator = self._comparator_for(results)
+        scores = decode_array(results['scores'])
+        # Matches are stored best first, so the first one is each PLO's best match
+        best = np.array([matches[0]['similarity_score'] for matches in results['top_matches'] if matches])
+        return {
+            'summary': results['summary'],
+            'recommendations': results['recommendations'],
+            **comparator._breakdown_fields(results, scores),
+            'best_match_distribution': {
+                'full': int(np.sum(best >= FULL_ALIGNMENT_THRESHOLD)),
+                'partial': int(np.sum((best >= PARTIAL_ALIGNMENT_THRESHOLD) & (best < FULL_ALIGNMENT_THRESHOLD))),
+                'none': int(np.sum(best < PARTIAL_ALIGNMENT_THRESHOLD))
+            },
+            'institutional_count': len(results['institutional_plos']),
+            'framework_count': len(comparator.flattened_cpf),
+            'framework': comparator.framework.name
+        }
+
+    def crosswalk_tile(self, results: Dict[str, Any], cpf_start: int, cpf_stop: int,
+                       plo_start: int, plo_stop: int) -> Dict[str, Any]:
+        """
+        One rectangle of the crosswalk from compact results: framework statements cpf_start..cpf_stop
+        (rows) against institutional PLOs plo_start..plo_stop (columns). Cells carry the rounded score
+        and Bloom alignment; the alignment type follows from the thresholds returned alongside.
+        """
+        comparator = self._comparator_for(results)
+        scores = decode_array(results['scores'])
+        n_plos, n_cpf = scores.shape
+        cpf_start, cpf_stop = max(0, cpf_start), min(n_cpf, cpf_stop)
+        plo_start, plo_stop = max(0, plo_start), min(n_plos, plo_stop)
+        
+        inst_masks = np.array(results['inst_bloom_masks'][plo_start:plo_stop], dtype=np.uint8)
+        bloom = (comparator.cpf_features.bloom_masks[cpf_start:cpf_stop, None] & inst_masks[None, :]) != 0
+        tile = scores[plo_start:plo_stop, cpf_start:cpf_stop].T
+        
+        return {
+            'shape': [n_cpf, n_plos],
+            'cpf_range': [cpf_start, cpf_stop],
+            'plo_range': [plo_start, plo_stop],
+            'cpf_plos': [
+                {'theme': theme, 'heading': heading, 'plo': plo}
+                for theme, heading, plo in comparator.flattened_cpf[cpf_start:cpf_stop]
+            ],
+            'institutional_plos': results['institutional_plos'][plo_start:plo_stop],
+            'scores': [[round(float(score), 3) for score in row] for row in tile],
+            'bloom_alignment': bloom.astype(np.uint8).tolist(),
+            'thresholds': {'full': FULL_ALIGNMENT_THRESHOLD, 'partial': PARTIAL_ALIGNMENT_THRESHOLD}
+        }
+
+    def detail_page(self, results: Dict[str, Any], start: int, stop: int, max_matches: int = 5) -> Dict[str, Any]:
+        """detailed_results entries for institutional PLOs start..stop of compact results"""
+        comparator = self._comparator_for(results)
+        n_plos = len(results['institutional_plos'])
+        start, stop = max(0, start), min(n_plos, stop)
+        return {
+            'total': n_plos,
+            'range': [start, stop],
+            'detailed_results': comparator._detailed_entries(
+                results, decode_array(results['scores']), start, stop, max_matches
+            )
+        }
     
     def _generate_recommendations(self, theme_scores: Dict[str, float], overall_alignment: float) -> List[str]:
         """Generate recommendations based on alignment scores"""
         recommendations = []
+        framework = self.framework.short_name
+        themes = [theme.lower() for theme in self.framework.themes]
+        # "knowledge, skills, and values" for CPF
+        coverage = f"{', '.join(themes[:-1])}, and {themes[-1]}" if len(themes) > 2 else ' and '.join(themes)
         
         # Overall alignment recommendations
         if overall_alignment >= 0.8:
-            recommendations.append("Excellent alignment with CPF framework! Your PLOs demonstrate strong coverage of knowledge, skills, and values.")
+            recommendations.append(f"Excellent alignment with {framework} framework! Your PLOs demonstrate strong coverage of {coverage}.")
         elif overall_alignment >= 0.6:
-            recommendations.append("Good alignment with CPF framework. Consider strengthening areas with lower scores.")
+            recommendations.append(f"Good alignment with {framework} framework. Consider strengthening areas with lower scores.")
         elif overall_alignment >= 0.4:
-            recommendations.append("Moderate alignment with CPF framework. Focus on improving coverage of underrepresented themes.")
+            recommendations.append(f"Moderate alignment with {framework} framework. Focus on improving coverage of underrepresented themes.")
         else:
-            recommendations.append("Limited alignment with CPF framework. Consider reviewing and revising PLOs to better align with Canadian standards.")
+            recommendations.append(f"Limited alignment with {framework} framework. Consider reviewing and revising PLOs to better align with {self.framework.standards}.")
         
-        # Theme-specific recommendations
+        # Theme-specific recommendations, from the framework file or built from the theme's headings
         for theme, score in theme_scores.items():
             if score < 0.5:
-                if theme == "Knowledge":
-                    recommendations.append(f"Consider strengthening {theme} PLOs to better cover core biological concepts and scientific understanding.")
-                elif theme == "Skills":
-                    recommendations.append(f"Enhance {theme} PLOs to include more emphasis on experimental design, data analysis, and communication.")
-                elif theme == "Values":
-                    recommendations.append(f"Develop {theme} PLOs to address ethical responsibility, societal impact, and professional development.")
+                advice = self.framework.theme_advice.get(theme)
+                if advice is None:
+                    headings = list(self.framework.themes.get(theme, {}))[:3]
+                    advice = f"Consider strengthening {theme} PLOs to better cover {framework} areas such as {'; '.join(headings)}." if headings else f"Consider strengthening {theme} PLOs."
+                recommendations.append(advice)
         
         return recommendations
     
@@ -378,29 +704,48 @@ class CPFComparator:
         if format == 'json':
             return json.dumps(results, indent=2)
         elif format == 'csv':
-            # Create a flattened CSV format
-            rows = []
-            for result in results['detailed_results']:
-                for match in result['matches']:
-                    rows.append({
-                        'Institutional PLO': result['institutional_plo'],
-                        'CPF Theme': match['cpf_theme'],
-                        'CPF Heading': match['cpf_heading'],
-                        'CPF PLO': match['cpf_plo'],
-                        'Similarity Score': match['similarity_score'],
-                        'Alignment Score': match['alignment_score'],
-                        'Common Terms': ', '.join(match['common_terms']),
-                        'Bloom Alignment': match['bloom_alignment']
-                    })
-            df = pd.DataFrame(rows)
-            return df.to_csv(index=False)
+            # One flattened row per match; result_export streams the same rows for downloads
+            from result_export import detailed_rows, iter_csv
+            return ''.join(iter_csv(detailed_rows(results)))
         else:
             raise ValueError("Unsupported format. Use 'json' or 'csv'")
     
-    def compare_with_other_frameworks(self, institutional_plos: List[str]) -> Dict[str, Any]:
-        """Compare with other frameworks (Vision and Change, BioSkills, etc.)"""
-        # This could be expanded to include other frameworks
-        # For now, return CPF comparison with framework identification
-        results = self.compare_plos(institutional_plos)
-        results['framework'] = 'Canadian Program Framework (CPF)'
-        return results 
\ No newline at end of file
+    def for_framework(self, framework: str) -> 'CPFComparator':
+        """Comparator for another registered framework that shares this encoder and embedding cache"""
+        if framework not in self._framework_comparators:
+            self._framework_comparators[framework] = CPFComparator(
+                self.encoder,
+                # No encoder means lexical scoring; don't let the new comparator try to load one
+                encoder_backend=None if self.encoder else 'lexical',
+                framework=framework,
+                registry=self.registry,
+                embedding_cache=self.embedding_cache
+            )
+        return self._framework_comparators[framework]
+    
+    def compare_with_other_frameworks(self, institutional_plos: List[str], frameworks: List[str] = None,
+                                      result_format: str = 'full', top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+        """
+        Compare one PLO set with several frameworks (all registered frameworks by default).
+        The PLOs are featurized and encoded once; each framework then only costs a matrix
+        multiply against its own prebuilt index. Returns results keyed by framework key.
+        """
+        if result_format not in ('full', 'compact'):
+            raise ValueError("Unsupported result format. Use 'full' or 'compact'")
+        
+        comparators = [self.for_framework(key) for key in (frameworks or self.registry.keys())]
+        
+        inst_features = FeatureStore(institutional_plos)
+        inst_embeddings = None
+        if self.encoder and institutional_plos:
+            inst_embeddings = self.embedding_cache.encode(institutional_plos, self._encode)
+        
+        results = {}
+        for comparator in comparators:
+            similarity_matrix = comparator._similarity_matrix(institutional_plos, inst_features, inst_embeddings)
+            framework_results = comparator._format_results(
+                institutional_plos, similarity_matrix, inst_features, result_format, top_k
+            )
+            framework_results['framework'] = comparator.framework.name
+            results[comparator.framework.key] = framework_results
+        return results
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# In-process cache size cap and optional on-disk tier (disabled unless a path is given)
+DEFAULT_MAX_BYTES = int(float(os.environ.get('EMBEDDING_CACHE_MAX_MB', 64)) * 1024 * 1024)
+DEFAULT_DB_PATH = os.environ.get('EMBEDDING_CACHE_DB') or None
+
+
+def normalize_text(text: str) -> str:
+    """Normalize PLO text so trivially different resubmissions share a cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache with an LRU memory tier and an optional SQLite tier"""
+
+    def __init__(self, model_name: str, max_bytes: int = DEFAULT_MAX_BYTES, db_path: Optional[str] = DEFAULT_DB_PATH):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Hit/miss counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS embedding_cache ('
+                    'key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)'
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a short-lived connection; sqlite3 connections cannot be shared across threads"""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def key(self, text: str) -> str:
+        """Cache key for a PLO under this cache's model"""
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the memory tier and evict least recently used entries over the cap"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def _load_from_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Fetch whatever the SQLite tier holds for the given keys"""
+        if not self.db_path or not keys:
+            return {}
+        found = {}
+        with self._connect() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f'SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _save_to_disk(self, items: Dict[str, np.ndarray]) -> None:
+        """Persist freshly computed embeddings to the SQLite tier"""
+        if not self.db_path or not items:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector) VALUES (?, ?, ?, ?)',
+                [(key, self.model_name, vector.shape[0], vector.tobytes()) for key, vector in items.items()]
+            )
+
+    def encode(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return embeddings for texts, encoding only the ones not already cached (in one batch)"""
+        keys = [self.key(text) for text in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._entries and key not in vectors:
+                    self._entries.move_to_end(key)
+                    vectors[key] = self._entries[key]
+                    self.hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        from_disk = self._load_from_disk(missing)
+
+        # Encode each distinct uncached text once
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in from_disk and key not in to_encode:
+                to_encode[key] = text
+        encoded = {}
+        if to_encode:
+            batch = np.asarray(encode(list(to_encode.values())), dtype=np.float32)
+            encoded = {key: batch[i] for i, key in enumerate(to_encode)}
+            self._save_to_disk(encoded)
+
+        with self._lock:
+            self.disk_hits += len(from_disk)
+            self.misses += len(encoded)
+            for key, vector in {**from_disk, **encoded}.items():
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                vectors[key] = vector
+                self._remember(key, vector)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def clear(self) -> None:
+        """Drop the in-process tier (the on-disk tier is left intact)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,315 @@
+"""
+Local embedding service: one process owns the sentence embedding model for every web worker.
+
+Without it each gunicorn worker loads its own copy of the model, so memory grows with the worker
+count. Run the service next to the app and point the workers at its Unix domain socket:
+
+    python embedding_service.py &                       # listens on instance/embedding.sock
+    EMBEDDING_SERVICE_SOCKET=instance/embedding.sock gunicorn app:app
+
+The service loads the ENCODER_BACKEND model (behind a MicroBatcher, so encode calls from all
+workers share model calls) and builds the framework embedding indexes at startup. Workers then
+use a RemoteEncoder, which has the same name and embedding space as the service's model. They
+memory-map those index files, so the page cache holds a single copy for every process. If the
+socket is not there when a worker starts, create_encoder loads the model in-process as before. A
+worker that loses the service mid-run encodes in-process until the service is back; it retries the
+socket every EMBEDDING_SERVICE_RETRY seconds and drops its own model once the service answers.
+
+Protocol: every message is a header (magic, op or status byte, payload length) and a payload.
+  - INFO: no payload; the reply is JSON {"name", "dim", "frameworks"}
+  - ENCODE: a count, that many UTF-8 byte lengths (uint32) and the texts; the reply is rows and
+    dim (uint32) followed by the little-endian float32 embeddings
+A reply with STATUS_ERROR carries a UTF-8 error message. Connections are kept open and carry any
+number of requests.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET = os.path.join(ROOT, 'instance', 'embedding.sock')
+EMBEDDING_SERVICE_SOCKET = os.environ.get('EMBEDDING_SERVICE_SOCKET') or None
+EMBEDDING_SERVICE_TIMEOUT = float(os.environ.get('EMBEDDING_SERVICE_TIMEOUT', 120))
+# Seconds between attempts to reach the service again after it went away
+EMBEDDING_SERVICE_RETRY = float(os.environ.get('EMBEDDING_SERVICE_RETRY', 30))
+
+MAGIC = b'PLOE'
+HEADER = struct.Struct('<4sBI')  # magic, op (requests) or status (replies), payload bytes
+OP_INFO = 1
+OP_ENCODE = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+# Largest payload either side accepts
+MAX_PAYLOAD = 512 * 1024 * 1024
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError('Embedding service connection closed')
+        received += count
+    return bytes(buffer)
+
+
+def send_message(sock: socket.socket, code: int, payload: bytes = b'') -> None:
+    sock.sendall(HEADER.pack(MAGIC, code, len(payload)))
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket):
+    """(op or status, payload) of the next message, or None when the peer closed the connection"""
+    try:
+        header = _recv_exactly(sock, HEADER.size)
+    except ConnectionError:
+        return None
+    magic, code, size = HEADER.unpack(header)
+    if magic != MAGIC or size > MAX_PAYLOAD:
+        raise ConnectionError('Malformed embedding service message')
+    return code, _recv_exactly(sock, size)
+
+
+def pack_texts(texts: List[str]) -> bytes:
+    encoded = [text.encode('utf-8') for text in texts]
+    return struct.pack(f'<I{len(encoded)}I', len(encoded), *(len(data) for data in encoded)) + b''.join(encoded)
+
+
+def unpack_texts(payload: bytes) -> List[str]:
+    (count,) = struct.unpack_from('<I', payload)
+    lengths = struct.unpack_from(f'<{count}I', payload, 4)
+    texts = []
+    offset = 4 + 4 * count
+    for length in lengths:
+        texts.append(payload[offset:offset + length].decode('utf-8'))
+        offset += length
+    return texts
+
+
+def pack_array(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array, dtype='<f4')
+    rows, dim = array.shape
+    return struct.pack('<II', rows, dim) + array.tobytes()
+
+
+def unpack_array(payload: bytes) -> np.ndarray:
+    rows, dim = struct.unpack_from('<II', payload)
+    return np.frombuffer(payload, dtype='<f4', count=rows * dim, offset=8).reshape(rows, dim).astype(np.float32)
+
+
+class RemoteEncoder:
+    """
+    Encoder backed by the embedding service, with the same interface as the in-process encoders.
+    Each thread keeps its own connection. fallback is a factory for an in-process encoder that is
+    used while the service is away (the socket is retried every retry_interval seconds); it must
+    produce the same embedding space (the same name).
+    """
+
+    def __init__(self, socket_path: str = EMBEDDING_SERVICE_SOCKET, timeout: float = EMBEDDING_SERVICE_TIMEOUT,
+                 fallback=None, retry_interval: float = EMBEDDING_SERVICE_RETRY):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        self._fallback_encoder = None
+        self._fallback_lock = threading.Lock()
+        # time.monotonic() after which the service is tried again; 0 while it is reachable
+        self._retry_at = 0.0
+
+        # Raises OSError when the service is not running, which create_encoder treats as absent
+        info = json.loads(self._request(OP_INFO))
+        # Identifies the embedding space in index and cache keys, as for the service's encoder
+        self.name = info['name']
+        self.dim = info['dim']
+
+    def _connection(self) -> socket.socket:
+        """This thread's connection, opened on first use (and again in a forked child)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or connection[0] != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.connection = connection = (os.getpid(), sock)
+        return connection[1]
+
+    def _close(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None and connection[0] == os.getpid():
+            connection[1].close()
+
+    def _request(self, op: int, payload: bytes = b'') -> bytes:
+        # A connection that went stale (service restarted) is reopened once
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, op, payload)
+                reply = recv_message(sock)
+                if reply is None:
+                    raise ConnectionError('Embedding service closed the connection')
+                break
+            except TimeoutError:
+                self._close()
+                raise
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+        status, body = reply
+        if status != STATUS_OK:
+            raise RuntimeError(f"Embedding service error: {body.decode('utf-8', 'replace')}")
+        return body
+
+    def _local_encoder(self):
+        """The in-process fallback encoder, loaded once"""
+        with self._fallback_lock:
+            if self._fallback_encoder is None:
+                encoder = self.fallback()
+                if encoder is None or encoder.name != self.name:
+                    raise RuntimeError(f"Embedding service is unavailable and no in-process {self.name} encoder exists")
+                self._fallback_encoder = encoder
+            return self._fallback_encoder
+
+    def _service_restored(self):
+        """Go back to the service and release the in-process model"""
+        with self._fallback_lock:
+            if self._retry_at:
+                self._retry_at = 0.0
+                self._fallback_encoder = None
+                print(f"Embedding service at {self.socket_path} is back, releasing the in-process model", file=sys.stderr)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in the service (unit-length float32 rows), or in-process while it is unavailable"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if time.monotonic() >= self._retry_at:
+            try:
+                embeddings = unpack_array(self._request(OP_ENCODE, pack_texts(texts)))
+            except TimeoutError:
+                raise
+            except OSError:
+                if self.fallback is None:
+                    raise
+                if not self._retry_at:
+                    print(f"Warning: embedding service at {self.socket_path} is unavailable, encoding in-process "
+                          f"and retrying every {self.retry_interval:g}s", file=sys.stderr)
+                self._retry_at = time.monotonic() + self.retry_interval
+            else:
+                if self._retry_at:
+                    self._service_restored()
+                return embeddings
+        return self._local_encoder().encode(texts)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                message = recv_message(self.request)
+            except ConnectionError:
+                return
+            if message is None:
+                return
+            op, payload = message
+            try:
+                if op == OP_INFO:
+                    reply = json.dumps(service.info()).encode('utf-8')
+                elif op == OP_ENCODE:
+                    reply = pack_array(service.encoder.encode(unpack_texts(payload)))
+                else:
+                    raise ValueError(f'Unknown op {op}')
+            except Exception as e:
+                send_message(self.request, STATUS_ERROR, str(e).encode('utf-8'))
+                continue
+            send_message(self.request, STATUS_OK, reply)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class EmbeddingService:
+    """The model and framework indexes owned by the service process"""
+
+    def __init__(self, backend: str = None):
+        from encoders import ENCODER_BATCH_WINDOW_MS, MicroBatcher, create_local_encoder
+        from framework_registry import get_registry
+
+        self.encoder = create_local_encoder(backend)
+        if self.encoder is None:
+            raise RuntimeError('No embedding model is available; install sentence-transformers or export the ONNX model')
+        # Every worker's requests arrive here concurrently, so batch even when the app default is off
+        if not isinstance(self.encoder, MicroBatcher):
+            self.encoder = MicroBatcher(self.encoder, window_ms=ENCODER_BATCH_WINDOW_MS or 5)
+
+        # Build (or load) every framework's index up front so workers only ever memory-map them
+        registry = get_registry()
+        self.frameworks = {}
+        self.dim = None
+        for key in registry.keys():
+            framework = registry.get(key)
+            self.dim = framework.embeddings(self.encoder).shape[1]
+            self.frameworks[key] = framework.version
+
+    def info(self):
+        return {'name': self.encoder.name, 'dim': self.dim, 'frameworks': self.frameworks}
+
+    def serve(self, socket_path: str = DEFAULT_SOCKET):
+        """Listen on socket_path until interrupted (SIGINT or SIGTERM)"""
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                raise RuntimeError(f'An embedding service is already listening on {socket_path}')
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a service that did not shut down cleanly
+                os.unlink(socket_path)
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+
+        server = _Server(socket_path, _Handler)
+        server.service = self
+        os.chmod(socket_path, 0o660)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print(f"Embedding service ({self.encoder.name}) listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Serve PLO embeddings to the web workers over a Unix socket.')
+    parser.add_argument('--socket', default=EMBEDDING_SERVICE_SOCKET or DEFAULT_SOCKET)
+    parser.add_argument('--backend', help='Encoder backend (default: ENCODER_BACKEND)')
+    args = parser.parse_args(argv)
+    EmbeddingService(args.backend).serve(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
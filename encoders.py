@@ -0,0 +1,388 @@
+"""
+Sentence encoder backends for CPFComparator.
+
+All backends return L2-normalized float32 embeddings, so cosine similarity is a dot product.
+The backend is chosen by ENCODER_BACKEND:
+  - auto (default): PyTorch sentence-transformers if installed, otherwise lexical scoring
+  - torch: PyTorch sentence-transformers
+  - onnx: the same model exported to ONNX and run with onnxruntime (no torch at runtime);
+          ONNX_QUANTIZE=1 selects the dynamically int8-quantized graph
+  - lexical: no embedding model; CPFComparator falls back to term-overlap scoring
+
+With EMBEDDING_SERVICE_SOCKET set, the model runs in a shared embedding service process
+(embedding_service.py) and create_encoder returns a RemoteEncoder for it, falling back to an
+in-process model when the service is not running.
+
+With ENCODER_BATCH_WINDOW_MS > 0, model backends are wrapped in a MicroBatcher: encode calls from
+concurrent requests are gathered for a few milliseconds and run as one model call on a single
+dispatcher thread, instead of contending for the CPU in the same model. It is off by default,
+since a lone request would only wait out the window; the embedding service always batches.
+
+Export the ONNX graphs once (this step needs torch) with:
+    python encoders.py export [--quantize]
+"""
+import argparse
+import collections
+import importlib.util
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import List
+
+import numpy as np
+
+from metrics import ENCODER_BATCH_REQUESTS, ENCODER_BATCH_SIZE, ENCODER_WAIT_SECONDS
+
+# Sentence embedding model used for semantic comparison
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# all-MiniLM-L6-v2 truncates inputs to 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+ENCODER_BACKEND = os.environ.get('ENCODER_BACKEND', 'auto')
+ONNX_MODEL_DIR = os.environ.get(
+    'ONNX_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'onnx', MODEL_NAME)
+)
+ONNX_QUANTIZE = os.environ.get('ONNX_QUANTIZE', '0') == '1'
+
+# Cross-request micro-batching (0 ms turns it off); see MicroBatcher
+ENCODER_BATCH_WINDOW_MS = float(os.environ.get('ENCODER_BATCH_WINDOW_MS', 0))
+ENCODER_MAX_BATCH = int(os.environ.get('ENCODER_MAX_BATCH', 256))
+# Longest a caller waits for its embeddings (queueing included) before giving up
+ENCODER_BATCH_TIMEOUT = float(os.environ.get('ENCODER_BATCH_TIMEOUT', 600))
+
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec('sentence_transformers') is not None
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows stay zero)"""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return (embeddings / np.maximum(norms, 1e-12)).astype(np.float32, copy=False)
+
+
+class SentenceTransformerEncoder:
+    """The reference PyTorch sentence-transformers model"""
+
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        # Identifies the embedding space in index and cache keys
+        self.name = model_name
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in batched forward passes into unit-length float32 embeddings"""
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """The same model run through an exported ONNX graph with onnxruntime on CPU"""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZE,
+                 model_name: str = MODEL_NAME, batch_size: int = 64):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        graph = os.path.join(model_dir, 'model.int8.onnx' if quantized else 'model.onnx')
+        if not os.path.exists(graph):
+            raise FileNotFoundError(f"{graph} not found; run `python encoders.py export{' --quantize' if quantized else ''}`")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(graph, options, providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id('[PAD]') or 0, pad_token='[PAD]')
+        self.batch_size = batch_size
+        self.name = f"{model_name}:onnx{'-int8' if quantized else ''}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the graph, mean-pool over real tokens and normalize (as sentence-transformers does)"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            inputs = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            token_embeddings = self.session.run(
+                None, {name: value for name, value in inputs.items() if name in self.input_names}
+            )[0]
+            mask = inputs['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            batches.append(_normalize(pooled))
+        return np.vstack(batches)
+
+
+class _EncodeRequest:
+    """One caller's texts, consumed by the dispatcher in slices, and the future of its embeddings"""
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.offset = 0
+        self.parts = []
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Gathers encode calls from concurrent requests and runs them as one model call.
+
+    The first waiting request opens a window of window_ms; requests arriving within it join the
+    same batch, up to max_batch texts, and a single dispatcher thread encodes the batch and hands
+    each caller its rows. Larger requests are encoded in max_batch slices taken in turn with the
+    other waiting requests, so a big submission never holds a small one back for more than a batch.
+    Each text's embedding is the one the encoder computes directly, up to float rounding from the
+    different batch shape. If a merged call fails, each request's slice is retried on its own, so
+    one bad request never fails the others.
+    """
+
+    def __init__(self, encoder, window_ms: float = ENCODER_BATCH_WINDOW_MS, max_batch: int = ENCODER_MAX_BATCH,
+                 timeout: float = ENCODER_BATCH_TIMEOUT):
+        self.encoder = encoder
+        # Identifies the embedding space in index and cache keys, as for the wrapped encoder
+        self.name = encoder.name
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._pending = collections.deque()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def _ensure_dispatcher(self):
+        """
+        Start the dispatcher thread in this process (threads do not survive a gunicorn fork), or
+        again if it died; waiting requests stay queued for the new thread
+        """
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._condition = threading.Condition()
+                self._pending = collections.deque()
+                self._pid = os.getpid()
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatch, name='encoder-batcher', daemon=True)
+                self._thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as part of the next batch and wait for their embeddings (up to timeout seconds)"""
+        if not texts:
+            return self.encoder.encode(texts)
+        self._ensure_dispatcher()
+        encode_request = _EncodeRequest(list(texts))
+        with self._condition:
+            self._pending.append(encode_request)
+            self._condition.notify()
+        try:
+            return encode_request.future.result(self.timeout)
+        except TimeoutError:
+            error = TimeoutError(f'No embeddings within {self.timeout:g}s')
+            # Drop the request (or its remaining slices) so the dispatcher skips it
+            self._fail(encode_request, error)
+            raise error from None
+
+    def _next_batch(self):
+        """Wait for the window to close (or a full batch), then take up to max_batch texts in turn"""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = self._pending[0].submitted + self.window
+            while sum(len(r.texts) - r.offset for r in self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = []
+            room = self.max_batch
+            while self._pending and room:
+                encode_request = self._pending.popleft()
+                count = min(room, len(encode_request.texts) - encode_request.offset)
+                batch.append((encode_request, encode_request.offset, count))
+                encode_request.offset += count
+                room -= count
+                # Unfinished requests go to the back, behind everything that is waiting
+                if encode_request.offset < len(encode_request.texts):
+                    self._pending.append(encode_request)
+            return batch
+
+    def _dispatch(self):
+        while True:
+            batch = []
+            try:
+                batch = self._next_batch()
+                self._run_batch(batch)
+            except BaseException as e:
+                # Never leave a caller waiting on a batch that went wrong outside the model call
+                for encode_request, _, _ in batch:
+                    self._fail(encode_request, e)
+                if not isinstance(e, Exception):
+                    raise
+
+    def _run_batch(self, batch):
+        texts = [text for r, start, count in batch for text in r.texts[start:start + count]]
+        ENCODER_BATCH_SIZE.observe(len(texts))
+        ENCODER_BATCH_REQUESTS.observe(len({id(r) for r, _, _ in batch}))
+        try:
+            embeddings = self.encoder.encode(texts)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0][0], e)
+            else:
+                # Find the failing request(s) by encoding each slice separately
+                for part in batch:
+                    self._deliver([part], None)
+            return
+        self._deliver(batch, embeddings)
+
+    def _fail(self, encode_request, error):
+        with self._condition:
+            if encode_request in self._pending:
+                self._pending.remove(encode_request)
+        if not encode_request.future.done():
+            try:
+                encode_request.future.set_exception(error)
+            except InvalidStateError:
+                # Completed by the dispatcher in the meantime
+                pass
+
+    def _deliver(self, batch, embeddings):
+        """Hand each request its rows of a batch, or encode them itself when embeddings is None"""
+        row = 0
+        for encode_request, start, count in batch:
+            row += count
+            if encode_request.future.done():
+                continue
+            if embeddings is not None:
+                part = embeddings[row - count:row]
+            else:
+                try:
+                    part = self.encoder.encode(encode_request.texts[start:start + count])
+                except Exception as e:
+                    self._fail(encode_request, e)
+                    continue
+            encode_request.parts.append(part)
+            if start + count == len(encode_request.texts):
+                ENCODER_WAIT_SECONDS.observe(time.perf_counter() - encode_request.submitted)
+                encode_request.future.set_result(np.vstack(encode_request.parts))
+
+    def stats(self):
+        """Requests and texts waiting for a batch"""
+        with self._condition:
+            return {
+                'queued_requests': len(self._pending),
+                'queued_texts': sum(len(r.texts) - r.offset for r in self._pending)
+            }
+
+
+def create_encoder(backend: str = None):
+    """Build the configured encoder backend; None means lexical scoring"""
+    backend = (backend or ENCODER_BACKEND).lower()
+
+    if backend != 'lexical' and os.environ.get('EMBEDDING_SERVICE_SOCKET'):
+        from embedding_service import RemoteEncoder
+        socket_path = os.environ['EMBEDDING_SERVICE_SOCKET']
+        try:
+            return RemoteEncoder(socket_path, fallback=lambda: create_local_encoder(backend))
+        except OSError:
+            print(f"Warning: embedding service not reachable at {socket_path}, loading the model in-process",
+                  file=sys.stderr)
+    return create_local_encoder(backend)
+
+
+def create_local_encoder(backend: str = None):
+    """Build the configured encoder backend in this process; None means lexical scoring"""
+    backend = (backend or ENCODER_BACKEND).lower()
+
+    if backend == 'lexical':
+        return None
+    if backend == 'torch':
+        return _batched(SentenceTransformerEncoder())
+    if backend == 'onnx':
+        return _batched(OnnxEncoder())
+    if backend != 'auto':
+        raise ValueError(f"Unknown ENCODER_BACKEND '{backend}'. Use auto, torch, onnx or lexical")
+
+    if SENTENCE_TRANSFORMERS_AVAILABLE:
+        return _batched(SentenceTransformerEncoder())
+    print("Warning: sentence-transformers not available, using fallback comparison method", file=sys.stderr)
+    return None
+
+
+def _batched(encoder):
+    """Put a MicroBatcher in front of a model encoder if ENCODER_BATCH_WINDOW_MS is set"""
+    return MicroBatcher(encoder) if ENCODER_BATCH_WINDOW_MS > 0 else encoder
+
+
+def export_onnx(model_dir: str = ONNX_MODEL_DIR, quantize: bool = False, model_name: str = MODEL_NAME) -> List[str]:
+    """Export the transformer of a sentence-transformers model to ONNX (and optionally int8)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(model_dir, exist_ok=True)
+    sentence_model = SentenceTransformer(model_name, device='cpu')
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+    tokenizer.save_pretrained(model_dir)
+
+    example = tokenizer(['An example learning outcome.'], return_tensors='pt', padding=True)
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    graph = os.path.join(model_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(example[name] for name in input_names),
+            graph,
+            input_names=input_names,
+            output_names=['last_hidden_state', 'pooler_output'],
+            dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']},
+            opset_version=14
+        )
+    written = [graph]
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_graph = os.path.join(model_dir, 'model.int8.onnx')
+        quantize_dynamic(graph, quantized_graph, weight_type=QuantType.QInt8)
+        written.append(quantized_graph)
+
+    return written
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Manage encoder backends')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    export = subcommands.add_parser('export', help='Export the embedding model to ONNX')
+    export.add_argument('--model-dir', default=ONNX_MODEL_DIR)
+    export.add_argument('--quantize', action='store_true', help='Also write a dynamically int8-quantized graph')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        for path in export_onnx(args.model_dir, args.quantize):
+            print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
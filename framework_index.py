@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import Callable, List
+
+import numpy as np
+
+# Directory holding precomputed framework embeddings (shared by all gunicorn workers)
+DEFAULT_INDEX_DIR = os.environ.get(
+    'FRAMEWORK_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'indexes')
+)
+
+
+def framework_hash(model_name: str, texts: List[str]) -> str:
+    """Hash the model name and framework statements so stale indexes are never reused"""
+    digest = hashlib.sha256(model_name.encode('utf-8'))
+    for text in texts:
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _safe_model_name(model_name: str) -> str:
+    """Turn a model identifier into something usable in a file name"""
+    return ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in model_name)
+
+
+def index_path(model_name: str, texts: List[str], index_dir: str = None, framework: str = 'cpf') -> str:
+    """Return the on-disk location of the index for this framework, model and framework text"""
+    index_dir = index_dir or DEFAULT_INDEX_DIR
+    filename = f"{_safe_model_name(framework)}-{_safe_model_name(model_name)}-{framework_hash(model_name, texts)[:16]}.npy"
+    return os.path.join(index_dir, filename)
+
+
+def _remove_stale_indexes(model_name: str, keep_path: str, framework: str) -> None:
+    """Delete indexes for the same framework and model built from older framework text"""
+    index_dir = os.path.dirname(keep_path)
+    # Only the version hash may differ: another model's name can extend this one (e.g. ..._onnx-int8)
+    pattern = re.compile(re.escape(f"{_safe_model_name(framework)}-{_safe_model_name(model_name)}-") + r'[0-9a-f]{16}\.npy')
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if pattern.fullmatch(name) and path != keep_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_or_build_index(model_name: str, texts: List[str],
+                        encode: Callable[[List[str]], np.ndarray],
+                        index_dir: str = None, framework: str = 'cpf') -> np.ndarray:
+    """
+    Load the framework embedding index as a read-only memory map, building it first if needed.
+
+    The file name embeds a hash of the model name and framework text, so editing the
+    framework (or switching models) automatically triggers a rebuild. The index is written
+    to a temporary file and renamed into place, so concurrent workers never see a partial file.
+    """
+    path = index_path(model_name, texts, index_dir, framework)
+
+    if os.path.exists(path):
+        try:
+            index = np.load(path, mmap_mode='r')
+            if index.ndim == 2 and index.shape[0] == len(texts) and index.dtype == np.float32:
+                return index
+        except (OSError, ValueError):
+            pass
+
+    embeddings = np.ascontiguousarray(encode(texts), dtype=np.float32)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, embeddings)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _remove_stale_indexes(model_name, path, framework)
+    except OSError:
+        # Read-only filesystems (e.g. serverless deployments) keep the index in memory only
+        return embeddings
+
+    return np.load(path, mmap_mode='r')
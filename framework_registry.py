@@ -0,0 +1,184 @@
+"""
+Outcome frameworks loaded from data files.
+
+Each file in FRAMEWORKS_DIR describes one framework as theme -> heading -> statements:
+  - JSON: {"name": ..., "short_name": ..., "standards": ..., "themes": {theme: {heading: [statement, ...]}}}
+          and an optional "theme_advice": {theme: recommendation shown when the theme scores low}
+  - CSV: one row per statement with theme, heading and statement columns; optional framework
+         and short_name columns (read from the first row) name the framework
+The file stem is the framework key (frameworks/cpf.json -> 'cpf').
+
+Statement features, the lexical index and the embedding index of a framework are built on first
+use and kept on its Framework object, so every comparator in the process shares them.
+"""
+import csv
+import json
+import os
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+
+from framework_index import framework_hash, load_or_build_index
+from lexical_backend import LexicalIndex
+from plo_features import FeatureStore
+
+DEFAULT_FRAMEWORKS_DIR = os.environ.get(
+    'FRAMEWORKS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frameworks')
+)
+
+# Framework used when none is requested
+DEFAULT_FRAMEWORK = 'cpf'
+
+FRAMEWORK_EXTENSIONS = ('.json', '.csv')
+
+
+class Framework:
+    """One framework's statements plus its lazily built scoring indexes"""
+
+    def __init__(self, key: str, name: str, themes: Dict[str, Dict[str, List[str]]],
+                 short_name: str = None, standards: str = None, theme_advice: Dict[str, str] = None):
+        self.key = key
+        self.name = name
+        self.short_name = short_name or name
+        # Used in recommendations ("... to better align with Canadian standards")
+        self.standards = standards or f"{self.short_name} standards"
+        self.themes = themes
+        # Recommendation per low-scoring theme; themes without one get generic advice
+        self.theme_advice = theme_advice or {}
+
+        # Flatten statements for comparison with headings
+        self.flattened = [
+            (theme, heading, statement)
+            for theme, headings in themes.items()
+            for heading, statements in headings.items()
+            for statement in statements
+        ]
+        self.texts = [statement for _, _, statement in self.flattened]
+
+        # Identifies the framework text in stored results that refer to statements by index
+        self.version = framework_hash('', self.texts)[:16]
+
+        self._features = None
+        self._lexical_index = None
+        self._embeddings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.flattened)
+
+    @property
+    def features(self) -> FeatureStore:
+        """Key terms and Bloom bitmasks of the statements, extracted once"""
+        with self._lock:
+            if self._features is None:
+                self._features = FeatureStore(self.texts)
+            return self._features
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        """Term-incidence index over the statements for the lexical (no-torch) scoring path"""
+        features = self.features
+        with self._lock:
+            if self._lexical_index is None:
+                self._lexical_index = LexicalIndex(features.terms)
+            return self._lexical_index
+
+    def embeddings(self, encoder) -> np.ndarray:
+        """Statement embeddings for an encoder, from the persisted, memory-mapped index"""
+        with self._lock:
+            if encoder.name not in self._embeddings:
+                self._embeddings[encoder.name] = load_or_build_index(
+                    encoder.name, self.texts, encoder.encode, framework=self.key
+                )
+            return self._embeddings[encoder.name]
+
+    def describe(self) -> Dict[str, Any]:
+        """Summary used by the framework listing API"""
+        return {
+            'key': self.key,
+            'name': self.name,
+            'short_name': self.short_name,
+            'version': self.version,
+            'themes': {theme: list(headings) for theme, headings in self.themes.items()},
+            'statements': len(self.flattened)
+        }
+
+
+def _load_json(key: str, path: str) -> Framework:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data.get('themes'), dict):
+        raise ValueError(f"{path}: expected a 'themes' object of theme -> heading -> statements")
+    return Framework(key, data.get('name', key), data['themes'], data.get('short_name'), data.get('standards'),
+                     data.get('theme_advice'))
+
+
+def _load_csv(key: str, path: str) -> Framework:
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [{(k or '').strip().lower(): (v or '').strip() for k, v in row.items()} for row in csv.DictReader(f)]
+
+    missing = {'theme', 'heading', 'statement'} - set(rows[0] if rows else ())
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+
+    # Themes and headings keep the order in which they first appear
+    themes = {}
+    for row in rows:
+        if row['statement']:
+            themes.setdefault(row['theme'], {}).setdefault(row['heading'], []).append(row['statement'])
+
+    return Framework(key, rows[0].get('framework') or key, themes, rows[0].get('short_name') or None)
+
+
+def load_framework(path: str) -> Framework:
+    """Load one framework file (.json or .csv); the key is the file stem"""
+    key, ext = os.path.splitext(os.path.basename(path))
+    if ext == '.json':
+        return _load_json(key, path)
+    if ext == '.csv':
+        return _load_csv(key, path)
+    raise ValueError(f"Unsupported framework file {path}. Use .json or .csv")
+
+
+class FrameworkRegistry:
+    """Frameworks available in a directory, each loaded on first request and then cached"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or DEFAULT_FRAMEWORKS_DIR
+        self._frameworks = {}
+        self._lock = threading.Lock()
+
+    def _paths(self) -> Dict[str, str]:
+        paths = {}
+        for name in sorted(os.listdir(self.directory)):
+            key, ext = os.path.splitext(name)
+            if ext in FRAMEWORK_EXTENSIONS:
+                paths.setdefault(key, os.path.join(self.directory, name))
+        return paths
+
+    def keys(self) -> List[str]:
+        """Keys of every framework in the directory"""
+        return list(self._paths())
+
+    def get(self, key: str = DEFAULT_FRAMEWORK) -> Framework:
+        """Return a framework by key; raises ValueError for unknown keys"""
+        with self._lock:
+            if key not in self._frameworks:
+                path = self._paths().get(key)
+                if path is None:
+                    raise ValueError(f"Unknown framework '{key}'. Available: {', '.join(self.keys())}")
+                self._frameworks[key] = load_framework(path)
+            return self._frameworks[key]
+
+
+_registry = None
+
+
+def get_registry() -> FrameworkRegistry:
+    """The process-wide registry over FRAMEWORKS_DIR"""
+    global _registry
+    if _registry is None:
+        _registry = FrameworkRegistry()
+    return _registry
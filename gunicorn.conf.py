@@ -0,0 +1,34 @@
+# Gunicorn settings; picked up automatically by `gunicorn app:app` from the project directory.
+import os
+
+# GUNICORN_PRELOAD=1 imports the app once in the master before forking workers. Combined with
+# PRELOAD_MODEL=1 the master also loads the embedding model and framework index, and forked
+# workers share those pages copy-on-write instead of each loading their own copy.
+preload_app = os.environ.get('GUNICORN_PRELOAD') == '1'
+preload_model = preload_app and os.environ.get('PRELOAD_MODEL') == '1'
+
+# Tokenizer thread pools do not survive fork; let each worker create its own
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if preload_app:
+        # The app is already imported here; without preloading, run `flask --app app ensure-schema`
+        from app import app, db, ensure_schema
+        with app.app_context():
+            ensure_schema()
+            # Workers must not inherit the master's pooled database connections
+            db.engine.dispose()
+    if preload_model:
+        from app import warm_up
+        warm_up()
+        server.log.info('Comparator preloaded in master')
+
+
+def post_fork(server, worker):
+    # Requeue comparison jobs lost with a previous worker before this one serves requests
+    from app import recover_jobs_once, warm_up_worker
+    recover_jobs_once()
+    # With WARMUP_ON_START=1, each worker warms up in the background unless the master preloaded the model
+    warm_up_worker()
@@ -0,0 +1,53 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ComparisonQueue:
+    """
+    Local background worker pool for comparison jobs.
+
+    Jobs are identified by their PLOSubmission id; the job function is responsible for
+    claiming the submission and recording its status in the database, so this class only
+    schedules work and keeps track of in-flight futures. Threads share the comparator
+    (and its loaded model) with the web worker, so no broker or extra process is needed.
+    """
+
+    def __init__(self, app, run_job: Callable[[int], None], max_workers: int = 2):
+        self.app = app
+        self.run_job = run_job
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plo-compare')
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, submission_id: int) -> Future:
+        """Schedule a submission for background comparison"""
+        with self._lock:
+            future = self._futures.get(submission_id)
+            if future is None or future.done():
+                future = self.executor.submit(self._run, submission_id)
+                self._futures[submission_id] = future
+            return future
+
+    def _run(self, submission_id: int) -> None:
+        """Execute one job inside an application context"""
+        try:
+            with self.app.app_context():
+                self.run_job(submission_id)
+        except Exception:
+            logger.exception('Comparison job for submission %s failed', submission_id)
+        finally:
+            with self._lock:
+                self._futures.pop(submission_id, None)
+
+    def pending_count(self) -> int:
+        """Number of jobs queued or running in this worker process"""
+        with self._lock:
+            return sum(1 for future in self._futures.values() if not future.done())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and optionally wait for running ones"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,70 @@
+from typing import AbstractSet, Callable, Dict, Iterable, List
+
+import numpy as np
+from scipy import sparse
+
+from plo_features import extract_key_terms
+
+# Weights of the Jaccard and overlap-coefficient components of the lexical score
+JACCARD_WEIGHT = 0.6
+OVERLAP_WEIGHT = 0.4
+
+
+class LexicalIndex:
+    """
+    Vectorized term-overlap similarity between institutional PLOs and a fixed framework.
+
+    Each statement's set of key terms (see plo_features.FeatureStore) becomes a row of a
+    sparse binary term-incidence matrix. Pairwise intersections for a whole batch then
+    come from a single sparse product, and the Jaccard / overlap-coefficient blend is
+    evaluated elementwise, reproducing CPFComparator._calculate_simple_similarity exactly.
+    """
+
+    def __init__(self, framework_terms: List[AbstractSet[str]],
+                 tokenize: Callable[[str], Iterable[str]] = extract_key_terms):
+        self.tokenize = tokenize
+        self.vocabulary: Dict[str, int] = {}
+        for terms in framework_terms:
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+        self.framework_matrix = self._incidence_matrix(framework_terms)
+        self.framework_sizes = np.array([len(terms) for terms in framework_terms], dtype=np.float64)
+
+    def _incidence_matrix(self, term_sets: List[AbstractSet[str]]) -> sparse.csr_matrix:
+        """Binary documents x vocabulary matrix; terms unknown to the framework are dropped"""
+        indptr = [0]
+        indices = []
+        for terms in term_sets:
+            indices.extend(self.vocabulary[term] for term in terms if term in self.vocabulary)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(term_sets), len(self.vocabulary))
+        )
+
+    def similarity_matrix(self, texts: List[str]) -> np.ndarray:
+        """Lexical similarity of every text against every framework statement"""
+        term_sets = [set(self.tokenize(text)) for text in texts]
+        return self.similarity_from_terms(term_sets)
+
+    def similarity_from_terms(self, term_sets: List[AbstractSet[str]]) -> np.ndarray:
+        """Same as similarity_matrix, for texts that have already been tokenized"""
+        if not term_sets:
+            return np.zeros((0, self.framework_matrix.shape[0]), dtype=np.float64)
+
+        # Set sizes include terms outside the framework vocabulary; intersections cannot
+        sizes = np.array([len(terms) for terms in term_sets], dtype=np.float64)[:, None]
+        framework_sizes = self.framework_sizes[None, :]
+        intersection = (self._incidence_matrix(term_sets) @ self.framework_matrix.T).toarray()
+
+        union = sizes + framework_sizes - intersection
+        smaller = np.minimum(sizes, framework_sizes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            jaccard = np.where(union > 0, intersection / union, 0.0)
+            overlap = np.where(smaller > 0, intersection / smaller, 0.0)
+
+        similarity = np.minimum((jaccard * JACCARD_WEIGHT) + (overlap * OVERLAP_WEIGHT), 1.0)
+        # Statements without key terms have no lexical similarity at all
+        similarity[(sizes == 0) | (framework_sizes == 0)] = 0.0
+        return similarity
@@ -0,0 +1,179 @@
+"""
+In-process metrics exposed in the Prometheus text format (served at /metrics).
+
+Counters and histograms are plain thread-safe objects, so the scoring code can record into
+them without any extra dependency. Values are per process: under gunicorn every worker
+keeps its own, so scrape workers individually or aggregate by instance.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Tuple
+
+# Histogram buckets in seconds, from sub-millisecond stages to multi-second requests
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Observations bucketed by upper bound, with a running sum and count per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for b, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][b] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        return self._values.get(self._key(labels), {'count': 0})['count']
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, dict(state, buckets=list(state['buckets']))) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            # Buckets are cumulative; +Inf equals the number of observations
+            for bound, count in zip(self.buckets, state['buckets']):
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', repr(bound)))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """All metrics of the process, plus collectors that report values owned by other objects"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        """collect() yields (name, kind, help, value) samples at scrape time, e.g. cache sizes"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collect in self._collectors:
+            for name, kind, help, value in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Comparison pipeline
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'plo_stage_seconds', 'Time spent in each stage of a comparison request', ['stage']
+))
+COMPARISONS = REGISTRY.register(Counter(
+    'plo_comparisons_total', 'Comparisons run, by result format', ['format']
+))
+PLOS_COMPARED = REGISTRY.register(Counter(
+    'plo_institutional_plos_total', 'Institutional PLOs compared'
+))
+PAIRS_SCORED = REGISTRY.register(Counter(
+    'plo_pairs_scored_total', 'Institutional x framework PLO pairs scored'
+))
+RESULT_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'plo_result_cache_lookups_total', '/api/compare result cache lookups: hit, miss or not_modified (304)', ['result']
+))
+
+# Encoder micro-batching (encoders.MicroBatcher)
+ENCODER_BATCH_SIZE = REGISTRY.register(Histogram(
+    'plo_encoder_batch_size', 'PLOs encoded per model call', buckets=(1, 4, 16, 32, 64, 128, 256, 512, 1024)
+))
+ENCODER_BATCH_REQUESTS = REGISTRY.register(Histogram(
+    'plo_encoder_batch_requests', 'Encode requests merged into one model call', buckets=(1, 2, 4, 8, 16, 32)
+))
+ENCODER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'plo_encoder_wait_seconds', 'Time from an encode request to its embeddings, queueing included'
+))
+
+# HTTP
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'plo_http_request_seconds', 'Flask handler time by endpoint', ['endpoint', 'method', 'status']
+))
+
+
+def stage_timer(stage: str):
+    """Time one pipeline stage into plo_stage_seconds"""
+    return STAGE_SECONDS.time(stage=stage)
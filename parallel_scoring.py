@@ -0,0 +1,207 @@
+"""
+Multi-process scoring of large submissions.
+
+With SCORING_WORKERS > 1, CPFComparator hands submissions larger than SCORING_CHUNK_SIZE PLOs to a
+ParallelScorer. The PLOs are cut into shards of SCORING_CHUNK_SIZE and scored on a process pool:
+each worker holds a lexical comparator for the same framework and memory-maps the framework
+embedding index, and computes its shard's key terms, Bloom masks, score rows and top-K matches
+(or detailed results). Shards are submitted as input batches arrive, so uploads are read and
+scored concurrently.
+
+Merging is deterministic and reproduces the serial path exactly: shard results are collected in
+submission order, score rows are stacked in that order, top-K lists and detailed results are
+concatenated, and the summary and theme/heading statistics are computed once from the stacked
+matrix. Sentence embeddings are still computed in the parent, through the embedding cache and
+with the same batching as the serial path, so transformer scores stay bit-identical; the model
+already spreads a forward pass over the cores with intra-op threads.
+
+Every web worker with SCORING_WORKERS > 1 owns its own pool, so enable it on audit or batch
+hosts (bulk_compare.py, COMPARISON_MODE=async) rather than on many-worker web deployments.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import COMPARISONS, PAIRS_SCORED, PLOS_COMPARED, stage_timer
+from plo_features import FeatureStore
+
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', 1))
+SCORING_CHUNK_SIZE = int(os.environ.get('SCORING_CHUNK_SIZE', 500))
+# spawn is safe with threaded parents (gunicorn threads, torch); fork starts faster for lexical scoring
+SCORING_START_METHOD = os.environ.get('SCORING_START_METHOD', 'spawn')
+
+# The comparator of a pool worker process (see _init_worker)
+_worker_comparator = None
+
+
+def _init_worker(framework: str, framework_version: str, cpf_embeddings):
+    """Build the worker's comparator; cpf_embeddings is the index path (memory-mapped) or the array"""
+    global _worker_comparator
+    from cpf_comparison import CPFComparator
+    comparator = CPFComparator(encoder_backend='lexical', framework=framework)
+    if comparator.framework_version != framework_version:
+        raise RuntimeError(f"Scoring worker loaded a different version of the {framework} framework")
+    if isinstance(cpf_embeddings, str):
+        cpf_embeddings = np.load(cpf_embeddings, mmap_mode='r')
+    comparator.cpf_embeddings = cpf_embeddings
+    _worker_comparator = comparator
+
+
+def score_shard(comparator, plos: List[str], embeddings: Optional[np.ndarray], result_format: Optional[str],
+                top_k: int) -> Dict[str, Any]:
+    """
+    Score one shard exactly as CPFComparator does for the whole submission. result_format picks
+    the per-row views built alongside the scores: 'compact' (top-K), 'full' (detailed results) or
+    None (scores and features only).
+    """
+    features = FeatureStore(plos)
+    if embeddings is not None:
+        scores = embeddings @ comparator.cpf_embeddings.T
+    else:
+        scores = comparator.lexical_index.similarity_from_terms(features.terms)
+
+    shard = {'scores': scores, 'features': features}
+    if result_format == 'compact':
+        shard['top_matches'] = comparator._top_matches(scores, features, top_k)
+    elif result_format == 'full':
+        bloom_alignment_matrix = features.bloom_alignment(comparator.cpf_features)
+        shard['detailed_results'] = comparator._detailed_results(plos, scores, features, bloom_alignment_matrix)
+    return shard
+
+
+def _score_in_worker(plos, embeddings, result_format, top_k):
+    return score_shard(_worker_comparator, plos, embeddings, result_format, top_k)
+
+
+class ParallelScorer:
+    """Shards institutional PLOs across a process pool per framework and merges the shards in order"""
+
+    def __init__(self, workers: int = SCORING_WORKERS, chunk_size: int = SCORING_CHUNK_SIZE,
+                 start_method: str = SCORING_START_METHOD):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, comparator) -> ProcessPoolExecutor:
+        """The pool for a comparator's framework, started on first use"""
+        key = comparator.framework.key
+        with self._lock:
+            if key not in self._pools:
+                cpf_embeddings = comparator.cpf_embeddings
+                if cpf_embeddings is not None and getattr(cpf_embeddings, 'filename', None):
+                    cpf_embeddings = cpf_embeddings.filename
+                self._pools[key] = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(key, comparator.framework_version, cpf_embeddings)
+                )
+            return self._pools[key]
+
+    def _shards(self, comparator, plo_batches: Iterable[List[str]], result_format: Optional[str],
+                top_k: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Encode each input batch (as the serial path does), cut the PLOs into chunk_size shards and
+        score them on the pool. Inputs no larger than one shard are scored in this process.
+        """
+        plos = []
+        futures = []
+        submitted = 0
+        # Embeddings of plos[submitted:] (None without an encoder)
+        pending_embeddings = None
+
+        def submit(count):
+            nonlocal submitted, pending_embeddings
+            shard_embeddings = None
+            if pending_embeddings is not None:
+                shard_embeddings, pending_embeddings = pending_embeddings[:count], pending_embeddings[count:]
+            futures.append(self._pool(comparator).submit(
+                _score_in_worker, plos[submitted:submitted + count], shard_embeddings, result_format, top_k
+            ))
+            submitted += count
+
+        for batch in plo_batches:
+            if not batch:
+                continue
+            if comparator.encoder:
+                with stage_timer('encode'):
+                    batch_embeddings = comparator.embedding_cache.encode(batch, comparator._encode)
+                pending_embeddings = (batch_embeddings if pending_embeddings is None
+                                      else np.concatenate([pending_embeddings, batch_embeddings]))
+            plos.extend(batch)
+            # The first shard waits until the input is known to span more than one
+            while len(plos) - submitted >= self.chunk_size and (futures or len(plos) - submitted > self.chunk_size):
+                submit(self.chunk_size)
+
+        if not futures:
+            # Too small to be worth a round trip through the pool
+            with stage_timer('similarity'):
+                return plos, [score_shard(comparator, plos, pending_embeddings, result_format, top_k)] if plos else []
+        if len(plos) > submitted:
+            submit(len(plos) - submitted)
+
+        with stage_timer('parallel_scoring'):
+            return plos, [future.result() for future in futures]
+
+    def score(self, comparator, institutional_plos: List[str]) -> Tuple[np.ndarray, FeatureStore]:
+        """The similarity matrix and features of a PLO list, scored across the pool"""
+        plos, shards = self._shards(comparator, [institutional_plos], None, 0)
+        return self._stack(comparator, plos, shards), FeatureStore.concatenate([shard['features'] for shard in shards])
+
+    def _stack(self, comparator, plos: List[str], shards: List[Dict[str, Any]]) -> np.ndarray:
+        PLOS_COMPARED.inc(len(plos))
+        PAIRS_SCORED.inc(len(plos) * len(comparator.flattened_cpf))
+        if not shards:
+            return np.zeros((0, len(comparator.flattened_cpf)), dtype=np.float32)
+        return np.vstack([shard['scores'] for shard in shards])
+
+    def compare_plo_batches(self, comparator, plo_batches: Iterable[List[str]], result_format: str = 'full',
+                            top_k: int = 10) -> Dict[str, Any]:
+        """Same results as CPFComparator.compare_plo_batches, with the per-row work spread over the pool"""
+        plos, shards = self._shards(comparator, plo_batches, result_format, top_k)
+        similarity_matrix = self._stack(comparator, plos, shards)
+        COMPARISONS.inc(format=result_format)
+
+        inst_bloom_masks = np.concatenate([shard['features'].bloom_masks for shard in shards]) if shards \
+            else np.zeros(0, dtype=np.uint8)
+        if result_format == 'compact':
+            top_matches = [matches for shard in shards for matches in shard['top_matches']]
+            return comparator._compact_results(plos, similarity_matrix, top_matches, inst_bloom_masks)
+
+        with stage_timer('summary'):
+            results = comparator._summarize(similarity_matrix)
+        results['detailed_results'] = [entry for shard in shards for entry in shard['detailed_results']]
+        with stage_timer('crosswalk'):
+            bloom_alignment_matrix = (inst_bloom_masks[:, None] & comparator.cpf_features.bloom_masks[None, :]) != 0
+            results['crosswalk_matrix'] = comparator._crosswalk_matrix(plos, similarity_matrix, bloom_alignment_matrix)
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown(cancel_futures=True)
+            self._pools = {}
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer() -> Optional[ParallelScorer]:
+    """The process-wide ParallelScorer, or None when SCORING_WORKERS <= 1"""
+    global _scorer
+    if SCORING_WORKERS <= 1:
+        return None
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = ParallelScorer()
+                atexit.register(_scorer.shutdown)
+    return _scorer
@@ -0,0 +1,399 @@
+"""
+Approximate nearest-neighbour search over every stored institutional PLO (the peer pool).
+
+The index is an inverted file (IVF) in plain NumPy. Spherical k-means centroids split the unit
+vectors into lists, and a query only scores the vectors of its PEER_INDEX_NPROBE closest lists,
+so its cost follows the list size rather than the size of the pool. Until the pool reaches
+PEER_INDEX_TRAIN_MIN vectors everything sits in a single list and queries are exact scans.
+
+Files in PEER_INDEX_DIR are append-only between trainings:
+  - vectors.f32: float32 rows, memory-mapped for queries
+  - entries.i64: (submission id, PLO position) of each row
+  - lists.i32: the IVF list of each row; its length is the committed row count
+  - removed.i64: rows superseded when a submission is indexed again (e.g. after an edit)
+  - centroids.npy, manifest.json: vector space, dimension and training generation
+Writers in different gunicorn workers are serialized by a lock file; every process picks up
+rows appended by the others on its next query. Adding vectors never retrains the centroids:
+once needs_training() reports the pool has outgrown them, train() runs k-means without holding
+the lock (the app starts it in a background thread), and only the final swap of the list files
+blocks other writers and readers.
+
+Usage:
+    python peer_index.py rebuild   # re-index every stored submission (e.g. after changing model)
+    python peer_index.py train     # retrain the centroids now
+"""
+import json
+import os
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, fine for a single dev server
+    fcntl = None
+
+DEFAULT_INDEX_DIR = os.environ.get(
+    'PEER_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'peer_index')
+)
+DEFAULT_NPROBE = int(os.environ.get('PEER_INDEX_NPROBE', 16))
+DEFAULT_TRAIN_MIN = int(os.environ.get('PEER_INDEX_TRAIN_MIN', 20000))
+
+# Centroids are retrained once the pool has grown this many times past the last training size
+RETRAIN_GROWTH = 4
+MAX_LISTS = 1024
+KMEANS_ITERATIONS = 15
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK = 4096
+
+# Dimension of the hashed key-term vectors used when no sentence encoder is loaded
+HASHED_DIM = 256
+
+
+class SpaceMismatchError(ValueError):
+    """The index holds vectors of another encoder (or dimension) than the caller's"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def hashed_term_vectors(term_sets: List[frozenset], dim: int = HASHED_DIM) -> np.ndarray:
+    """Signed feature hashing of key-term sets; dot products approximate term overlap"""
+    vectors = np.zeros((len(term_sets), dim), dtype=np.float32)
+    for i, terms in enumerate(term_sets):
+        for term in terms:
+            # crc32 rather than hash() so every process maps a term to the same column
+            h = zlib.crc32(term.encode('utf-8'))
+            vectors[i, h % dim] += -1.0 if h & 0x80000000 else 1.0
+    return _normalize(vectors)
+
+
+def vector_space(comparator) -> str:
+    """Name of the space plo_vectors embeds into; an index only ever holds one"""
+    return comparator.encoder.name if comparator.encoder else f'hashed-terms-{HASHED_DIM}'
+
+
+def plo_vectors(comparator, plos: List[str]) -> np.ndarray:
+    """Unit vectors of PLOs: sentence embeddings (through the embedding cache), else hashed key terms"""
+    if not plos:
+        return np.zeros((0, 0), dtype=np.float32)
+    if comparator.encoder:
+        return _normalize(comparator.embedding_cache.encode(plos, comparator._encode))
+    from plo_features import FeatureStore
+    return hashed_term_vectors(FeatureStore(plos).terms)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Closest centroid (by dot product) of every vector, in chunks to bound memory"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids of unit vectors (cosine k-means); empty lists are reseeded at random"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        # Per-list sums via one sort and reduceat instead of a Python loop over lists
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=len(empty) > len(vectors))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class PeerIndex:
+    """Persistent IVF index of institutional PLO vectors, keyed by (submission id, PLO position)"""
+
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR, nprobe: int = DEFAULT_NPROBE,
+                 train_min: int = DEFAULT_TRAIN_MIN):
+        self.directory = directory
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._reset_state()
+
+    def _reset_state(self):
+        self.manifest: Optional[Dict] = None
+        self.centroids: Optional[np.ndarray] = None
+        self._generation = None
+        self._count = 0
+        self._removed_read = 0
+        self._lists: List[np.ndarray] = []
+        self._entries = np.zeros((0, 2), dtype=np.int64)
+        self._removed = np.zeros(0, dtype=bool)
+        self._vectors = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """Cross-process lock; queries share it, writers take it exclusively"""
+        with open(self._path('.lock'), 'a') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+
+    def _rows(self, name: str, itemsize: int) -> int:
+        try:
+            return os.path.getsize(self._path(name)) // itemsize
+        except OSError:
+            return 0
+
+    def _replace_file(self, name: str, write):
+        """Write a file next to its destination and rename it into place"""
+        temporary = self._path(f'.{name}.tmp')
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.replace(temporary, self._path(name))
+
+    def _refresh(self):
+        """Catch up with rows (or a retraining) written by any process since the last call"""
+        try:
+            with open(self._path('manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            self._reset_state()
+            return
+
+        if manifest['generation'] != self._generation:
+            self._reset_state()
+            self.manifest = manifest
+            self._generation = manifest['generation']
+            if manifest['trained_on']:
+                self.centroids = np.load(self._path('centroids.npy'))
+            self._lists = [np.zeros(0, dtype=np.int64) for _ in range(manifest['lists'])]
+        self.manifest = manifest
+
+        committed = self._rows('lists.i32', 4)
+        if committed > self._count:
+            new = committed - self._count
+            lists = np.fromfile(self._path('lists.i32'), dtype=np.int32, count=new, offset=self._count * 4)
+            entries = np.fromfile(self._path('entries.i64'), dtype=np.int64, count=new * 2,
+                                  offset=self._count * 16).reshape(-1, 2)
+            rows = np.arange(self._count, committed, dtype=np.int64)
+
+            # Rows are appended in order, so every list stays sorted (sequential memmap reads)
+            order = np.argsort(lists, kind='stable')
+            present, starts = np.unique(lists[order], return_index=True)
+            for list_id, chunk in zip(present, np.split(rows[order], starts[1:])):
+                self._lists[list_id] = np.concatenate([self._lists[list_id], chunk])
+
+            self._entries = np.concatenate([self._entries, entries])
+            self._removed = np.concatenate([self._removed, np.zeros(new, dtype=bool)])
+            self._count = committed
+            self._vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode='r',
+                                      shape=(committed, manifest['dim']))
+
+        removed = self._rows('removed.i64', 8)
+        if removed > self._removed_read:
+            rows = np.fromfile(self._path('removed.i64'), dtype=np.int64, count=removed - self._removed_read,
+                               offset=self._removed_read * 8)
+            self._removed[rows[rows < self._count]] = True
+            self._removed_read = removed
+
+    def add(self, submission_id: int, vectors: np.ndarray, space: str):
+        """Index a submission's PLO vectors, superseding whatever was indexed for it before"""
+        vectors = _normalize(vectors)
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.manifest is None:
+                self.manifest = {'space': space, 'dim': None, 'lists': 1, 'trained_on': 0, 'generation': 0}
+            else:
+                self._check_space(space)
+            if self.manifest['dim'] is None and len(vectors):
+                self.manifest['dim'] = int(vectors.shape[1])
+                self._replace_file('manifest.json', lambda f: f.write(json.dumps(self.manifest).encode('utf-8')))
+
+            superseded = np.flatnonzero((self._entries[:, 0] == submission_id) & ~self._removed)
+            if len(superseded):
+                with open(self._path('removed.i64'), 'ab') as f:
+                    f.write(superseded.astype(np.int64).tobytes())
+
+            if len(vectors):
+                # Drop anything a crashed writer appended past the committed row count
+                for name, itemsize in (('vectors.f32', 4 * self.manifest['dim']), ('entries.i64', 16)):
+                    if os.path.exists(self._path(name)):
+                        os.truncate(self._path(name), self._count * itemsize)
+                entries = np.column_stack([np.full(len(vectors), submission_id), np.arange(len(vectors))])
+                lists = (_assign(vectors, self.centroids) if self.centroids is not None
+                         else np.zeros(len(vectors), dtype=np.int32))
+                with open(self._path('vectors.f32'), 'ab') as f:
+                    f.write(vectors.tobytes())
+                with open(self._path('entries.i64'), 'ab') as f:
+                    f.write(entries.astype(np.int64).tobytes())
+                # Appending the list ids commits the rows
+                with open(self._path('lists.i32'), 'ab') as f:
+                    f.write(lists.astype(np.int32).tobytes())
+
+            self._refresh()
+
+    def _check_space(self, space: str, dim: int = None):
+        """Raise SpaceMismatchError unless the index holds vectors of this space (caller has refreshed)"""
+        if self.manifest is None:
+            return
+        if self.manifest['space'] != space or (dim and self.manifest['dim'] and self.manifest['dim'] != dim):
+            raise SpaceMismatchError(f"Peer index holds {self.manifest['space']} vectors, not {space}; "
+                                     "run `python peer_index.py rebuild`")
+
+    def needs_training(self) -> bool:
+        """Whether the pool has grown enough (PEER_INDEX_TRAIN_MIN, RETRAIN_GROWTH) to retrain the centroids"""
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._refresh()
+            if self.manifest is None:
+                return False
+            alive = self._count - int(self._removed.sum())
+            return alive >= self.train_min and alive >= RETRAIN_GROWTH * self.manifest['trained_on']
+
+    def train(self) -> bool:
+        """
+        Retrain the centroids on the current pool: k-means on a sample of the live rows, then every
+        row is reassigned. The slow part runs on a snapshot without any lock; rows added meanwhile
+        are assigned when the new lists are swapped in. Returns False if there was nothing to train
+        or another process retrained first.
+        """
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._refresh()
+            if not self._count:
+                return False
+            generation, count = self.manifest['generation'], self._count
+            stored, removed = self._vectors, self._removed.copy()
+
+        alive_rows = np.flatnonzero(~removed)
+        if not len(alive_rows):
+            return False
+        n_lists = int(min(MAX_LISTS, max(1, 4 * np.sqrt(len(alive_rows))), len(alive_rows)))
+        rng = np.random.default_rng(len(alive_rows))
+        sample_size = min(len(alive_rows), n_lists * KMEANS_SAMPLE_PER_LIST)
+        sample = np.sort(rng.choice(alive_rows, sample_size, replace=False))
+        centroids = spherical_kmeans(np.asarray(stored[sample]), n_lists)
+        lists = _assign(stored, centroids)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.manifest is None or self.manifest['generation'] != generation:
+                return False
+            if self._count > count:
+                lists = np.concatenate([lists, _assign(self._vectors[count:], centroids)])
+            manifest = dict(self.manifest, lists=n_lists, trained_on=len(alive_rows),
+                            generation=generation + 1)
+            self._replace_file('centroids.npy', lambda f: np.save(f, centroids))
+            self._replace_file('lists.i32', lambda f: f.write(lists.tobytes()))
+            self._replace_file('manifest.json', lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+            self._refresh()
+        return True
+
+    def query(self, vectors: np.ndarray, k: int = 10, exclude_submission: int = None,
+              nprobe: int = None, space: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k pooled PLOs for each query vector, best first, skipping one submission (usually the
+        caller's own). Returns (entries, scores): (n, k, 2) (submission id, PLO position) pairs and
+        (n, k) cosine scores, padded with -1 / -inf when fewer than k rows qualify. Raises
+        SpaceMismatchError if space (see vector_space) is not the space of the indexed vectors, and
+        ValueError if nprobe is less than 1.
+        """
+        if nprobe is not None and nprobe < 1:
+            raise ValueError(f'nprobe must be at least 1, got {nprobe}')
+        vectors = _normalize(vectors)
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._refresh()
+            if space is not None:
+                self._check_space(space, vectors.shape[1] if len(vectors) else None)
+            lists, centroids, stored = self._lists, self.centroids, self._vectors
+            entries, removed = self._entries, self._removed
+
+        found = np.full((len(vectors), k, 2), -1, dtype=np.int64)
+        scores = np.full((len(vectors), k), -np.inf, dtype=np.float32)
+        if not lists or stored is None:
+            return found, scores
+
+        nprobe = min(self.nprobe if nprobe is None else nprobe, len(lists))
+        if centroids is None:
+            probes = np.zeros((len(vectors), 1), dtype=np.intp)
+        else:
+            closeness = vectors @ centroids.T
+            probes = np.argpartition(-closeness, nprobe - 1, axis=1)[:, :nprobe]
+
+        for i, vector in enumerate(vectors):
+            candidates = np.sort(np.concatenate([lists[p] for p in probes[i]]))
+            keep = ~removed[candidates]
+            if exclude_submission is not None:
+                keep &= entries[candidates, 0] != exclude_submission
+            candidates = candidates[keep]
+            if not len(candidates):
+                continue
+            candidate_scores = stored[candidates] @ vector
+            top = min(k, len(candidates))
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best], kind='stable')]
+            found[i, :top] = entries[candidates[best]]
+            scores[i, :top] = candidate_scores[best]
+        return found, scores
+
+    def reset(self):
+        """Remove every indexed vector"""
+        with self._lock, self._file_lock():
+            for name in ('manifest.json', 'centroids.npy', 'vectors.f32', 'entries.i64', 'lists.i32', 'removed.i64'):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._reset_state()
+
+    def stats(self) -> Dict[str, int]:
+        """Pool size and IVF shape as of the last refresh"""
+        with self._lock:
+            return {
+                'vectors': self._count,
+                'live_vectors': self._count - int(self._removed.sum()),
+                'lists': len(self._lists),
+                'trained_on': self.manifest['trained_on'] if self.manifest else 0
+            }
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description='Maintain the peer PLO index.')
+    parser.add_argument('command', choices=['rebuild', 'train'])
+    args = parser.parse_args(argv)
+
+    from app import PLOSubmission, app, get_comparator
+    index = PeerIndex()
+    if args.command == 'train':
+        index.train()
+    else:
+        index.reset()
+        comparator = get_comparator()
+        with app.app_context():
+            for submission in PLOSubmission.query.filter_by(status='completed').order_by(PLOSubmission.id):
+                plos = json.loads(submission.plos_data)
+                index.add(submission.id, plo_vectors(comparator, plos), vector_space(comparator))
+        if index.needs_training():
+            index.train()
+    print(json.dumps(index.stats()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
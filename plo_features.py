@@ -0,0 +1,86 @@
+import re
+from typing import Dict, FrozenSet, List
+
+import numpy as np
+
+# Words ignored when extracting key terms
+COMMON_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are',
+    'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she',
+    'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'
+})
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Bloom's Taxonomy levels and their indicator verbs; a level's bit is 1 << its position here
+BLOOM_VERBS = {
+    'remember': ('define', 'describe', 'identify', 'list', 'name', 'recall', 'recognize', 'state'),
+    'understand': ('explain', 'summarize', 'interpret', 'classify', 'compare', 'contrast', 'describe'),
+    'apply': ('apply', 'demonstrate', 'execute', 'implement', 'solve', 'use', 'utilize'),
+    'analyze': ('analyze', 'examine', 'investigate', 'compare', 'differentiate', 'distinguish'),
+    'evaluate': ('evaluate', 'assess', 'critique', 'judge', 'appraise', 'examine'),
+    'create': ('create', 'design', 'develop', 'formulate', 'generate', 'produce', 'construct')
+}
+BLOOM_LEVELS = tuple(BLOOM_VERBS)
+
+
+def extract_key_terms(text: str) -> List[str]:
+    """Extract key terms from text for similarity analysis"""
+    words = WORD_PATTERN.findall(text.lower())
+    return [word for word in words if word not in COMMON_WORDS and len(word) > 2]
+
+
+def bloom_mask(text: str) -> int:
+    """Bitmask of the Bloom's Taxonomy levels whose verbs appear in text"""
+    text_lower = text.lower()
+    mask = 0
+    for bit, verbs in enumerate(BLOOM_VERBS.values()):
+        if any(verb in text_lower for verb in verbs):
+            mask |= 1 << bit
+    return mask
+
+
+def bloom_levels(mask: int) -> Dict[str, bool]:
+    """Expand a Bloom bitmask into the {level: present} dict used in results"""
+    return {level: bool(mask & (1 << bit)) for bit, level in enumerate(BLOOM_LEVELS)}
+
+
+class FeatureStore:
+    """Key terms and Bloom bitmasks for a list of statements, computed once per statement"""
+
+    def __init__(self, texts: List[str]):
+        self.terms: List[FrozenSet[str]] = [frozenset(extract_key_terms(text)) for text in texts]
+        self.bloom_masks = np.array([bloom_mask(text) for text in texts], dtype=np.uint8)
+        self._bloom_dicts = None
+
+    @classmethod
+    def concatenate(cls, stores: List['FeatureStore']) -> 'FeatureStore':
+        """Join feature stores built for consecutive batches of statements"""
+        joined = cls([])
+        for store in stores:
+            joined.terms.extend(store.terms)
+        if stores:
+            joined.bloom_masks = np.concatenate([store.bloom_masks for store in stores])
+        return joined
+
+    def subset(self, start: int, stop: int) -> 'FeatureStore':
+        """Features for statements start..stop (e.g. one program out of a stacked batch)"""
+        part = FeatureStore([])
+        part.terms = self.terms[start:stop]
+        part.bloom_masks = self.bloom_masks[start:stop]
+        return part
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @property
+    def bloom_dicts(self) -> List[Dict[str, bool]]:
+        """Per-statement Bloom level dicts, built on first use"""
+        if self._bloom_dicts is None:
+            self._bloom_dicts = [bloom_levels(int(mask)) for mask in self.bloom_masks]
+        return self._bloom_dicts
+
+    def bloom_alignment(self, other: 'FeatureStore') -> np.ndarray:
+        """Boolean matrix marking pairs (self x other) that share at least one Bloom level"""
+        return (self.bloom_masks[:, None] & other.bloom_masks[None, :]) != 0
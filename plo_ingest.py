@@ -0,0 +1,133 @@
+import csv
+import io
+from typing import IO, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Column names tried (in order) when looking for the PLO column of an uploaded table
+PLO_COLUMNS = ['PLO', 'Learning Outcome', 'Outcome', 'PLO Text', 'Description']
+
+# Number of PLOs handed to the scoring engine at a time
+DEFAULT_BATCH_SIZE = 256
+
+
+def detect_plo_column(header: Sequence[Any]) -> int:
+    """Index of the PLO column from the header row only; falls back to the first column"""
+    names = [str(name).strip() if name is not None else '' for name in header]
+    for candidate in PLO_COLUMNS:
+        if candidate in names:
+            return names.index(candidate)
+    return 0
+
+
+def _clean(value) -> Optional[str]:
+    """Normalize one cell; None for empty cells"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text == 'nan':
+        return None
+    return text
+
+
+def _batched(values: Iterable[Optional[str]], batch_size: int) -> Iterator[List[str]]:
+    """Group non-empty values into lists of at most batch_size"""
+    batch = []
+    for value in values:
+        if value is None:
+            continue
+        batch.append(value)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _text_stream(stream: IO[bytes]) -> io.TextIOWrapper:
+    """Decode an uploaded binary stream incrementally (tolerating a UTF-8 BOM)"""
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def _iter_csv(stream: IO[bytes]) -> Iterator[Optional[str]]:
+    reader = csv.reader(_text_stream(stream))
+    header = next(reader, None)
+    if header is None:
+        return
+    column = detect_plo_column(header)
+    for row in reader:
+        yield _clean(row[column]) if column < len(row) else None
+
+
+def _iter_xlsx(stream: IO[bytes]) -> Iterator[Optional[str]]:
+    from openpyxl import load_workbook
+
+    # Read-only mode streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        column = detect_plo_column(header)
+        for row in rows:
+            yield _clean(row[column]) if column < len(row) else None
+    finally:
+        workbook.close()
+
+
+def _iter_xls(stream: IO[bytes]) -> Iterator[Optional[str]]:
+    import pandas as pd
+
+    # Legacy .xls cannot be streamed; read the header, then only the PLO column
+    header = pd.read_excel(stream, nrows=0).columns
+    stream.seek(0)
+    column = pd.read_excel(stream, usecols=[detect_plo_column(header)]).iloc[:, 0]
+    for value in column.dropna():
+        yield _clean(value)
+
+
+def _iter_txt(stream: IO[bytes]) -> Iterator[Optional[str]]:
+    for line in _text_stream(stream):
+        yield _clean(line)
+
+
+READERS = {
+    '.csv': _iter_csv,
+    '.xlsx': _iter_xlsx,
+    '.xls': _iter_xls,
+    '.txt': _iter_txt
+}
+
+
+def iter_plo_batches(stream: IO[bytes], file_ext: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[str]]:
+    """Yield PLOs from an uploaded file in batches, without saving or fully loading the file"""
+    reader = READERS.get(file_ext.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+    return _batched(reader(stream), batch_size)
+
+
+def normalize_programs(payload) -> List[Tuple[str, List[str]]]:
+    """
+    Accept either {"programs": {name: [plos]}} or {"programs": [{"name": ..., "plos": [...]}]}
+    (or the bare mapping / list) and return [(name, cleaned plos)] in input order.
+    """
+    if isinstance(payload, dict) and 'programs' in payload:
+        payload = payload['programs']
+
+    if isinstance(payload, dict):
+        items = list(payload.items())
+    elif isinstance(payload, list):
+        items = []
+        for position, program in enumerate(payload):
+            if not isinstance(program, dict):
+                raise ValueError("Each program must be an object with 'name' and 'plos'")
+            items.append((program.get('name') or f"Program {position + 1}", program.get('plos')))
+    else:
+        raise ValueError("'programs' must be a list or an object")
+
+    programs = []
+    for name, plos in items:
+        if not isinstance(plos, list):
+            raise ValueError(f"PLOs for program '{name}' must be a list")
+        programs.append((str(name), [plo for plo in (_clean(value) for value in plos) if plo]))
+    return programs
@@ -0,0 +1,247 @@
+"""
+Streaming exports of comparison results.
+
+CSV rows are produced one institutional PLO at a time straight from the score matrix and written
+to the response in chunks of roughly CSV_CHUNK_BYTES, so a download never holds the flattened
+row list (or a DataFrame of it) in memory. Parquet and Arrow IPC output are built column-wise from
+the score arrays in record batches of EXPORT_BATCH_PLOS institutional PLOs; text columns are
+dictionary-encoded, so each PLO and framework statement is stored once per batch rather than once
+per pair. The columnar formats need the optional pyarrow package.
+"""
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from cpf_comparison import FULL_ALIGNMENT_THRESHOLD, PARTIAL_ALIGNMENT_THRESHOLD, decode_array
+from plo_features import FeatureStore
+
+CSV_COLUMNS = ['Institutional PLO', 'CPF Theme', 'CPF Heading', 'CPF PLO', 'Similarity Score',
+               'Alignment Score', 'Common Terms', 'Bloom Alignment']
+
+# Flush the CSV buffer to the response once it grows past this many characters
+CSV_CHUNK_BYTES = 64 * 1024
+
+# Institutional PLOs per Parquet row group / Arrow record batch
+EXPORT_BATCH_PLOS = 256
+
+# Download metadata per format: (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+ALIGNMENT_TYPES = ['None', 'Partial', 'Full']
+
+
+class ScoredProgram(NamedTuple):
+    """One program's score matrix with everything an export needs to label its rows"""
+    name: Optional[str]
+    comparator: Any
+    plos: List[str]
+    scores: np.ndarray
+    features: FeatureStore
+
+
+def from_results(comparator, results: Dict[str, Any], name: str = None) -> ScoredProgram:
+    """Wrap stored compact results; key terms are re-extracted since only the top-K keep theirs"""
+    if results.get('format') != 'compact':
+        raise ValueError('Columnar exports need results in the compact format')
+    comparator = comparator._comparator_for(results)
+    plos = results['institutional_plos']
+    return ScoredProgram(name, comparator, plos, decode_array(results['scores']), FeatureStore(plos))
+
+
+def scored_programs(comparator, programs: Iterable[tuple]) -> Iterator[ScoredProgram]:
+    """Score (name, PLOs) pairs as one stacked matrix (see CPFComparator.score_programs), skipping empty programs"""
+    for name, plos, scores, features in comparator.score_programs([(name, plos) for name, plos in programs if plos]):
+        yield ScoredProgram(name, comparator, plos, scores, features)
+
+
+def _plo_rows(program: ScoredProgram, i: int) -> Iterator[list]:
+    """CSV rows of institutional PLO i, best match first (the order of detailed_results)"""
+    comparator = program.comparator
+    cpf_terms = comparator.cpf_features.terms
+    inst_terms = program.features.terms[i]
+    bloom_row = (program.features.bloom_masks[i] & comparator.cpf_features.bloom_masks) != 0
+
+    similarities = [float(score) for score in program.scores[i]]
+    rounded = np.array([round(similarity, 3) for similarity in similarities])
+    for j in np.argsort(-rounded, kind='stable'):
+        theme, heading, cpf_plo = comparator.flattened_cpf[j]
+        yield [program.plos[i], theme, heading, cpf_plo, float(rounded[j]),
+               comparator._classify_alignment(similarities[j])[0],
+               ', '.join(sorted(inst_terms & cpf_terms[j])), bool(bloom_row[j])]
+
+
+def detailed_rows(results: Dict[str, Any]) -> Iterator[list]:
+    """CSV rows of full-format results"""
+    for result in results['detailed_results']:
+        for match in result['matches']:
+            yield [result['institutional_plo'], match['cpf_theme'], match['cpf_heading'], match['cpf_plo'],
+                   match['similarity_score'], match['alignment_score'], ', '.join(match['common_terms']),
+                   match['bloom_alignment']]
+
+
+def program_rows(programs: Iterable[ScoredProgram], with_program: bool = False) -> Iterator[list]:
+    """CSV rows of every program in turn, optionally prefixed with the program name"""
+    for program in programs:
+        prefix = [program.name] if with_program else []
+        for i in range(len(program.plos)):
+            for row in _plo_rows(program, i):
+                yield prefix + row
+
+
+def iter_csv(rows: Iterable[list], with_program: bool = False) -> Iterator[str]:
+    """Header plus rows as CSV text, yielded in chunks of about CSV_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow((['Program'] if with_program else []) + CSV_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Parquet and Arrow exports need pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+def arrow_schema(pa):
+    """Columns of the Parquet/Arrow exports; one row per institutional x framework PLO pair"""
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('program', text),
+        ('institutional_index', pa.int32()),
+        ('institutional_plo', text),
+        ('cpf_index', pa.int32()),
+        ('cpf_theme', text),
+        ('cpf_heading', text),
+        ('cpf_plo', text),
+        ('similarity_score', pa.float32()),
+        ('alignment_score', pa.float32()),
+        ('alignment_type', text),
+        ('bloom_alignment', pa.bool_())
+    ])
+
+
+def _framework_columns(comparator) -> Dict[str, tuple]:
+    """Per-statement dictionary codes and values of the framework text columns"""
+    columns = {}
+    for name, position in (('cpf_theme', 0), ('cpf_heading', 1), ('cpf_plo', 2)):
+        labels = [statement[position] for statement in comparator.flattened_cpf]
+        values = list(dict.fromkeys(labels))
+        codes = {value: code for code, value in enumerate(values)}
+        columns[name] = (np.array([codes[label] for label in labels], dtype=np.int32), values)
+    return columns
+
+
+def record_batches(programs: Iterable[ScoredProgram], batch_plos: int = EXPORT_BATCH_PLOS):
+    """Arrow record batches built from slices of each program's score matrix (rows in PLO x statement order)"""
+    pa = _require_pyarrow()
+    schema = arrow_schema(pa)
+    framework_columns = {}
+
+    def dictionary(codes, values):
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), pa.array(values, type=pa.string()))
+
+    for program in programs:
+        comparator = program.comparator
+        if comparator.framework.key not in framework_columns:
+            framework_columns[comparator.framework.key] = _framework_columns(comparator)
+        statement_columns = framework_columns[comparator.framework.key]
+        n_statements = len(comparator.flattened_cpf)
+
+        for start in range(0, len(program.plos), batch_plos):
+            stop = min(start + batch_plos, len(program.plos))
+            rows = (stop - start) * n_statements
+            local_index = np.repeat(np.arange(stop - start, dtype=np.int32), n_statements)
+            cpf_index = np.tile(np.arange(n_statements, dtype=np.int32), stop - start)
+
+            # Classify at the stored precision so the types agree with detailed_results
+            block = program.scores[start:stop]
+            alignment_code = ((block >= PARTIAL_ALIGNMENT_THRESHOLD).astype(np.int32)
+                              + (block >= FULL_ALIGNMENT_THRESHOLD)).ravel()
+            similarity = np.asarray(block, dtype=np.float32).ravel()
+            bloom = (program.features.bloom_masks[start:stop, None] & comparator.cpf_features.bloom_masks[None, :]) != 0
+
+            columns = [
+                dictionary(np.zeros(rows, dtype=np.int32), [program.name or '']),
+                pa.array(local_index + start, type=pa.int32()),
+                dictionary(local_index, program.plos[start:stop]),
+                pa.array(cpf_index, type=pa.int32()),
+                *(dictionary(codes[cpf_index], values) for codes, values in statement_columns.values()),
+                pa.array(similarity, type=pa.float32()),
+                pa.array(np.array([0.0, 0.5, 1.0], dtype=np.float32)[alignment_code], type=pa.float32()),
+                dictionary(alignment_code, ALIGNMENT_TYPES),
+                pa.array(bloom.ravel(), type=pa.bool_())
+            ]
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are handed to the response after every batch"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_columnar(programs: Iterable[ScoredProgram], format: str = 'parquet',
+                  batch_plos: int = EXPORT_BATCH_PLOS) -> Iterator[bytes]:
+    """Parquet file or Arrow IPC stream, yielded a row group / record batch at a time"""
+    pa = _require_pyarrow()
+    sink = _ChunkSink()
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, arrow_schema(pa), compression='zstd')
+    elif format == 'arrow':
+        writer = pa.ipc.new_stream(sink, arrow_schema(pa))
+    else:
+        raise ValueError("Unsupported format. Use 'parquet' or 'arrow'")
+
+    for batch in record_batches(programs, batch_plos):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(programs: Iterable[ScoredProgram], format: str, with_program: bool = False) -> Iterator:
+    """Chunks of an export in any of EXPORT_FORMATS"""
+    if format == 'csv':
+        return iter_csv(program_rows(programs, with_program), with_program)
+    if format in ('parquet', 'arrow'):
+        _require_pyarrow()  # fail before the response starts
+        return iter_columnar(programs, format)
+    raise ValueError(f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}")
@@ -0,0 +1,90 @@
+"""
+RemoteEncoder across an embedding service restart: it falls back to the in-process encoder while
+the socket is gone and returns to the service once it answers again.
+
+Usage:
+    python -m pytest tests/test_embedding_service.py
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from embedding_service import RemoteEncoder, _Handler, _Server  # noqa: E402
+
+
+class FakeEncoder:
+    """Deterministic stand-in for a model: every row is filled with `value`"""
+    name = 'fake-model'
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.full((len(texts), 4), self.value, dtype=np.float32)
+
+
+class FakeService:
+    def __init__(self):
+        self.encoder = FakeEncoder(1.0)
+
+    def info(self):
+        return {'name': self.encoder.name, 'dim': 4, 'frameworks': {}}
+
+
+class TrackingHandler(_Handler):
+    def setup(self):
+        self.server.connections.append(self.request)
+
+
+def start_service(socket_path, service):
+    server = _Server(socket_path, TrackingHandler)
+    server.service = service
+    server.connections = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_service(server, socket_path):
+    """Stop like a killed service process: the socket file and every open connection go away"""
+    server.shutdown()
+    server.server_close()
+    for connection in server.connections:
+        connection.shutdown(socket.SHUT_RDWR)
+        connection.close()
+    os.unlink(socket_path)
+
+
+def test_remote_encoder_reconnects_after_service_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, 'embedding.sock')
+        service = FakeService()
+        server = start_service(socket_path, service)
+
+        local = FakeEncoder(2.0)
+        encoder = RemoteEncoder(socket_path, timeout=5, fallback=lambda: local, retry_interval=0.2)
+        assert encoder.encode(['a', 'b'])[0, 0] == 1.0
+
+        # Service down: served in-process, and the socket is not retried before the interval
+        stop_service(server, socket_path)
+        assert encoder.encode(['a'])[0, 0] == 2.0
+        server = start_service(socket_path, service)
+        assert encoder.encode(['a'])[0, 0] == 2.0
+        assert local.calls == 2
+
+        # After the interval the restarted service answers and the local encoder is released
+        time.sleep(0.25)
+        calls = service.encoder.calls
+        assert encoder.encode(['a'])[0, 0] == 1.0
+        assert service.encoder.calls == calls + 1
+        assert encoder._fallback_encoder is None
+        stop_service(server, socket_path)